@@ -0,0 +1,274 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from growth import perbarui_metrik
+from storage import normalisasi, kunci_duplikat, _ke_record
+import metrics
+from metrics import ukur
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Tanpa flock (Windows) jurnal proses yang masih hidup tidak bisa dibedakan
+# dari jurnal proses mati, dan rename/unlink file yang sedang terbuka gagal;
+# write-behind dimatikan dan penyimpanan kembali sinkron.
+ANTRIAN_DIDUKUNG = fcntl is not None
+
+# Penyimpanan write-behind: simpan() hanya menulis satu baris ke jurnal lokal
+# lalu mengembalikan pratinjau status pertumbuhan; thread latar menulis ke
+# storage per batch (bila ukuran_batch tercapai atau interval habis).
+#
+# Jurnal per proses (antrian-<pid>-<acak>.jurnal) berisi {"seq", "record"}
+# untuk setiap pemeriksaan dan {"selesai": seq} setelah batch berhasil
+# ditulis; jurnal dikosongkan saat buffer habis. Jurnal dibuat dengan nama
+# sementara, dikunci, baru diganti nama, sehingga jurnal yang terlihat tanpa
+# kunci pasti milik proses yang sudah mati. Saat start (dan di tiap worker
+# gunicorn setelah fork) entri dengan seq > selesai terakhir dari jurnal
+# seperti itu diputar ulang; pemeriksaan yang ternyata sudah tersimpan
+# dilewati.
+#
+# Kebijakan fsync jurnal (STUNTING_FSYNC):
+#   selalu : fsync setiap pemeriksaan (tahan mati listrik, paling lambat)
+#   batch  : fsync oleh thread latar setiap flush/interval (default)
+#   tidak  : diserahkan ke OS
+DIR_JURNAL = 'dataset/antrian'
+KEBIJAKAN_FSYNC = ('selalu', 'batch', 'tidak')
+
+
+class AntrianPenuh(Exception):
+    pass
+
+
+class AntrianSimpan:
+    def __init__(self, storage, direktori=None, ukuran_batch=None, interval=None, kapasitas=None,
+                 fsync=None, batas_tunggu=None):
+        if not ANTRIAN_DIDUKUNG:
+            raise RuntimeError("Antrian write-behind membutuhkan fcntl (tidak tersedia di platform ini)")
+        env = os.environ.get
+        self.storage = storage
+        self.direktori = direktori or env('STUNTING_DIR_ANTRIAN', DIR_JURNAL)
+        self.ukuran_batch = ukuran_batch or int(env('STUNTING_ANTRIAN_BATCH', 200))
+        self.interval = interval or float(env('STUNTING_ANTRIAN_INTERVAL', 0.5))
+        self.kapasitas = kapasitas or int(env('STUNTING_ANTRIAN_KAPASITAS', 10000))
+        self.batas_tunggu = batas_tunggu or float(env('STUNTING_ANTRIAN_TUNGGU', 10))
+        self.fsync = fsync or env('STUNTING_FSYNC', 'batch')
+        if self.fsync not in KEBIJAKAN_FSYNC:
+            raise ValueError(f"STUNTING_FSYNC harus salah satu dari: {', '.join(KEBIJAKAN_FSYNC)}")
+        self._pid = None
+        atexit.register(self.tutup)
+        self.pulihkan()
+
+    def mulai(self):
+        # Dipanggil di post_fork agar jurnal worker yang mati langsung
+        # dipulihkan, tidak menunggu simpan() pertama.
+        self._pastikan_jalan()
+
+    def _pastikan_jalan(self):
+        # Thread dan jurnal dibuat di proses yang memakainya: dengan
+        # gunicorn preload_app objek ini dibuat di master sebelum fork.
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._kondisi = threading.Condition()
+        self._buffer = []
+        self._tertunda = {}
+        self._seq = 0
+        self._berhenti = False
+        self._segera = False
+        self._perlu_fsync = False
+        self.tertulis = self.gagal = 0
+
+        os.makedirs(self.direktori, exist_ok=True)
+        self.pulihkan()
+        self.path_jurnal = os.path.join(self.direktori, f'antrian-{self._pid}-{uuid.uuid4().hex[:8]}.jurnal')
+        sementara = self.path_jurnal + '.baru'
+        self._fd = os.open(sementara, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        os.rename(sementara, self.path_jurnal)
+        self._thread = threading.Thread(target=self._jalan, name='antrian-simpan', daemon=True)
+        self._thread.start()
+
+    def _tulis_jurnal(self, isi):
+        os.write(self._fd, (json.dumps(isi, ensure_ascii=False) + '\n').encode('utf-8'))
+
+    def simpan(self, record):
+        self._pastikan_jalan()
+        baris = normalisasi(record)
+        with self._kondisi:
+            # Backpressure: penulis ditahan bila buffer penuh (storage lambat
+            # atau gagal), dan ditolak bila tetap penuh setelah batas_tunggu.
+            if not self._kondisi.wait_for(lambda: len(self._buffer) < self.kapasitas, self.batas_tunggu):
+                metrics.tambah('stunting_galat_total', tahap='antrian_penuh')
+                raise AntrianPenuh(f"Antrian penyimpanan penuh ({self.kapasitas} data)")
+            self._seq += 1
+            record = _ke_record(baris)
+            self._tulis_jurnal({'seq': self._seq, 'record': record})
+            if self.fsync == 'selalu':
+                os.fsync(self._fd)
+            else:
+                self._perlu_fsync = True
+            self._buffer.append((self._seq, record))
+            status = self._pratinjau(baris)
+            if len(self._buffer) >= self.ukuran_batch:
+                self._kondisi.notify_all()
+            return status
+
+    def _pratinjau(self, baris):
+        # Status pertumbuhan yang akan dihasilkan storage setelah flush:
+        # dihitung dari status tersimpan ditambah pemeriksaan yang masih antre.
+        tertunda = self._tertunda.get(baris['id_anak'])
+        if tertunda is not None:
+            status = tertunda[1]
+        elif not hasattr(self.storage, 'engine'):
+            # CSV menghitung status dengan memindai seluruh file; terlalu
+            # mahal untuk setiap simpan, pratinjau dilewati.
+            return None
+        else:
+            status = self.storage.status_anak(baris['id_anak'])
+        baru = perbarui_metrik(status, baris)
+        self._tertunda[baris['id_anak']] = (self._seq, baru)
+        return baru
+
+    def _jalan(self):
+        gagal_beruntun = 0
+        while True:
+            with self._kondisi:
+                batas = time.monotonic() + self.interval
+                while len(self._buffer) < self.ukuran_batch and not (self._berhenti or self._segera and self._buffer):
+                    sisa = batas - time.monotonic()
+                    if sisa <= 0:
+                        break
+                    self._kondisi.wait(sisa)
+                if not self._buffer:
+                    self._sinkron_jurnal()
+                    if self._berhenti:
+                        return
+                    continue
+                batch = self._buffer[:self.ukuran_batch]
+
+            try:
+                with ukur('flush_antrian'):
+                    self.storage.simpan_banyak([r for _, r in batch])
+            except Exception as e:
+                # Data tetap di buffer dan jurnal; dicoba lagi setelah interval.
+                self.gagal += 1
+                gagal_beruntun += 1
+                metrics.tambah('stunting_galat_total', tahap='flush_antrian')
+                print(f"[ERROR] Gagal menulis antrian ke penyimpanan: {e}")
+                with self._kondisi:
+                    if self._berhenti and gagal_beruntun >= 3:
+                        return
+                    self._kondisi.wait(self.interval)
+                continue
+
+            gagal_beruntun = 0
+            with self._kondisi:
+                terakhir = batch[-1][0]
+                del self._buffer[:len(batch)]
+                self.tertulis += len(batch)
+                self._tertunda = {k: v for k, v in self._tertunda.items() if v[0] > terakhir}
+                if self._buffer:
+                    self._tulis_jurnal({'selesai': terakhir})
+                else:
+                    os.ftruncate(self._fd, 0)
+                self._perlu_fsync = True
+                self._sinkron_jurnal()
+                self._kondisi.notify_all()
+
+    def _sinkron_jurnal(self):
+        if self._perlu_fsync and self.fsync != 'tidak':
+            os.fsync(self._fd)
+        self._perlu_fsync = False
+
+    def pulihkan(self):
+        # Putar ulang jurnal proses lain yang sudah mati (tidak dikunci).
+        jumlah = 0
+        for path in sorted(glob.glob(os.path.join(self.direktori, 'antrian-*.jurnal'))):
+            if path == getattr(self, 'path_jurnal', None):
+                continue
+            try:
+                f = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                # Proses lain bisa saja sudah memulihkan dan menghapus file
+                # ini sebelum kunci didapat; lewati bila path tidak lagi
+                # menunjuk ke file yang sama.
+                try:
+                    if os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                entri, selesai = [], 0
+                for baris in f:
+                    try:
+                        isi = json.loads(baris)
+                    except ValueError:
+                        continue
+                    if 'selesai' in isi:
+                        selesai = max(selesai, isi['selesai'])
+                    else:
+                        entri.append(isi)
+                records = [e['record'] for e in entri if e['seq'] > selesai]
+                if records:
+                    ids = {r['id_anak'] for r in records}
+                    tersimpan = self.storage.kunci_tersimpan(ids)
+                    baru = [r for r in records if kunci_duplikat(r['Tanggal'], r['id_anak'], r['Tinggi_cm'],
+                                                                 r['Berat_kg']) not in tersimpan]
+                    jumlah += self.storage.simpan_banyak(baru)
+                os.unlink(path)
+        if jumlah:
+            print(f"{jumlah} pemeriksaan dipulihkan dari jurnal antrian")
+        return jumlah
+
+    def tutup(self, batas_waktu=30):
+        # Dipanggil saat proses berhenti: kuras buffer lalu hapus jurnal.
+        if self._pid != os.getpid():
+            return
+        with self._kondisi:
+            self._berhenti = True
+            self._kondisi.notify_all()
+        self._thread.join(batas_waktu)
+        if self._thread.is_alive():
+            # Thread masih menulis (storage macet): fd dibiarkan terbuka dan
+            # terkunci sampai proses keluar, lalu jurnal dipulihkan.
+            print(f"[ERROR] Antrian belum selesai setelah {batas_waktu} detik; sisa akan dipulihkan "
+                  f"dari {self.path_jurnal}")
+            return
+        with self._kondisi:
+            sisa = len(self._buffer)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        if not sisa:
+            os.unlink(self.path_jurnal)
+        else:
+            print(f"[ERROR] {sisa} pemeriksaan belum tersimpan; akan dipulihkan dari {self.path_jurnal}")
+        self._pid = None
+
+    def kuras(self, batas_waktu=None):
+        # Tunggu sampai semua pemeriksaan yang antre tertulis ke storage.
+        if self._pid != os.getpid():
+            return True
+        with self._kondisi:
+            self._segera = True
+            self._kondisi.notify_all()
+            try:
+                return self._kondisi.wait_for(lambda: not self._buffer, batas_waktu)
+            finally:
+                self._segera = False
+
+    def statistik(self):
+        if self._pid != os.getpid():
+            return {'antre': 0, 'tertulis': 0, 'gagal': 0}
+        with self._kondisi:
+            return {'antre': len(self._buffer), 'tertulis': self.tertulis, 'gagal': self.gagal}
@@ -0,0 +1,214 @@
+import gzip
+import json
+import math
+import zlib
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from batch import skrining_batch, simpan_batch
+from antrian import AntrianPenuh
+import metrics
+from metrics import ukur
+
+# API JSON versi 1. Memakai instance StuntingAI yang sama dengan form HTML
+# sehingga engine, tabel WHO dan penyimpanannya juga sama.
+VERSI_API = 'v1'
+BATAS_BULK = 10000
+BATAS_GZIP = 1024
+BARIS_PER_POTONGAN = 500
+
+# field -> (tipe, wajib, nilai yang diizinkan)
+SKEMA_ANAK = {
+    'nama': ('string', True, None),
+    'gender': ('string', True, ('laki-laki', 'perempuan')),
+    'umur': ('number', True, None),
+    'tipe_umur': ('string', False, ('bulan', 'tahun')),
+    'tinggi': ('number', True, None),
+    'berat': ('number', True, None),
+    'id_anak': ('string', False, None),
+}
+
+KOLOM_BULK = ['id_anak', 'Umur_Bulan', 'Z_Score_TB', 'Z_Score_BB', 'Skor_Fuzzy', 'Kesimpulan']
+
+
+def _galat(field, pesan):
+    return {'field': field, 'pesan': pesan}
+
+
+def _cocok_tipe(nilai, tipe):
+    if tipe == 'number':
+        return isinstance(nilai, (int, float)) and not isinstance(nilai, bool) and math.isfinite(nilai)
+    return isinstance(nilai, str)
+
+
+def validasi_anak(data):
+    # Mengembalikan (data bersih, daftar galat). Data bersih hanya berarti
+    # bila daftar galat kosong.
+    if not isinstance(data, dict):
+        return None, [_galat(None, "Setiap data anak harus berupa objek JSON")]
+
+    galat = [_galat(k, "Field tidak dikenal") for k in data if k not in SKEMA_ANAK]
+    bersih = {}
+    for field, (tipe, wajib, pilihan) in SKEMA_ANAK.items():
+        nilai = data.get(field)
+        if nilai is None:
+            if wajib:
+                galat.append(_galat(field, "Wajib diisi"))
+            continue
+        if not _cocok_tipe(nilai, tipe):
+            galat.append(_galat(field, f"Harus bertipe {tipe}"))
+            continue
+        if tipe == 'string':
+            nilai = nilai.strip().lower() if pilihan else nilai.strip()
+            if wajib and not nilai:
+                galat.append(_galat(field, "Wajib diisi"))
+                continue
+        if pilihan and nilai not in pilihan:
+            galat.append(_galat(field, f"Harus salah satu dari: {', '.join(pilihan)}"))
+            continue
+        bersih[field] = nilai
+
+    bersih.setdefault('tipe_umur', 'bulan')
+    for field in ('tinggi', 'berat'):
+        if field in bersih and bersih[field] <= 0:
+            galat.append(_galat(field, "Harus lebih dari 0"))
+    if 'umur' in bersih:
+        umur_bulan = bersih['umur'] * 12 if bersih['tipe_umur'] == 'tahun' else bersih['umur']
+        if umur_bulan < 0 or umur_bulan > 60:
+            galat.append(_galat('umur', "Umur harus antara 0 - 60 bulan (5 Tahun)"))
+        bersih['umur_bulan'] = umur_bulan
+    return bersih, galat
+
+
+def _terima_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def _respon_json(isi, status=200):
+    body = json.dumps(isi, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    respon = Response(body, status=status, mimetype='application/json')
+    if _terima_gzip() and len(body) > BATAS_GZIP:
+        respon.set_data(gzip.compress(body, compresslevel=5))
+        respon.headers['Content-Encoding'] = 'gzip'
+    respon.headers['Vary'] = 'Accept-Encoding'
+    return respon
+
+
+def _gzip_bertahap(potongan):
+    kompresor = zlib.compressobj(5, zlib.DEFLATED, 31)
+    for data in potongan:
+        hasil = kompresor.compress(data)
+        if hasil:
+            yield hasil
+    yield kompresor.flush()
+
+
+def _ambil_json():
+    data = request.get_json(silent=True)
+    if data is None:
+        return None, (jsonify(errors=[_galat(None, "Body harus JSON dengan Content-Type application/json")]), 400)
+    return data, None
+
+
+def _nilai_json(nilai):
+    if hasattr(nilai, 'item'):
+        nilai = nilai.item()
+    if isinstance(nilai, float) and not math.isfinite(nilai):
+        return None
+    return nilai
+
+
+def buat_api(ai):
+    api = Blueprint('api', __name__)
+
+    @api.route('/asesmen', methods=['POST'])
+    def asesmen():
+        data, galat = _ambil_json()
+        if galat:
+            return galat
+        bersih, galat = validasi_anak(data)
+        if galat:
+            return jsonify(errors=galat), 422
+
+        try:
+            hasil = ai.analisa_kesehatan(bersih['nama'], bersih['gender'], bersih['umur_bulan'],
+                                         bersih['tinggi'], bersih['berat'], bersih['umur'],
+                                         bersih['tipe_umur'], bersih.get('id_anak'))
+        except AntrianPenuh as e:
+            return jsonify(errors=[_galat(None, str(e))]), 503, {'Retry-After': '5'}
+        return _respon_json(hasil)
+
+    @api.route('/asesmen/bulk', methods=['POST'])
+    def asesmen_bulk():
+        import pandas as pd
+
+        data, galat = _ambil_json()
+        if galat:
+            return galat
+        # Body berupa array anak, atau {"anak": [...], "simpan": bool}.
+        simpan = True
+        if isinstance(data, dict):
+            simpan = bool(data.get('simpan', True))
+            data = data.get('anak')
+        if not isinstance(data, list):
+            return jsonify(errors=[_galat('anak', "Harus berupa array data anak")]), 400
+        if len(data) > BATAS_BULK:
+            return jsonify(errors=[_galat('anak', f"Maksimal {BATAS_BULK} anak per permintaan")]), 413
+
+        galat_item, baris_valid, indeks_valid = {}, [], []
+        for i, item in enumerate(data):
+            bersih, galat = validasi_anak(item)
+            if galat:
+                galat_item[i] = galat
+            else:
+                baris_valid.append(bersih)
+                indeks_valid.append(i)
+
+        hasil_per_indeks = {}
+        if baris_valid:
+            df = pd.DataFrame(baris_valid)
+            if 'id_anak' not in df.columns:
+                df['id_anak'] = ''
+            with ukur('skrining_batch'):
+                hasil = skrining_batch(ai, df)
+            if simpan:
+                with ukur('simpan'):
+                    simpan_batch(hasil, ai.storage)
+            for kesimpulan, jumlah in hasil['Kesimpulan'].value_counts().items():
+                metrics.tambah('stunting_asesmen_total', int(jumlah), kesimpulan=kesimpulan)
+            for i, baris in zip(indeks_valid, hasil[KOLOM_BULK].itertuples(index=False, name=None)):
+                hasil_per_indeks[i] = [_nilai_json(v) for v in baris]
+
+        ndjson = (request.args.get('format') == 'ndjson'
+                  or 'application/x-ndjson' in request.headers.get('Accept', ''))
+        if not ndjson:
+            return _respon_json({
+                'versi': VERSI_API,
+                'jumlah': len(data),
+                'valid': len(hasil_per_indeks),
+                'kolom': KOLOM_BULK,
+                'hasil': [hasil_per_indeks.get(i) for i in range(len(data))],
+                'errors': [{'indeks': i, 'errors': g} for i, g in galat_item.items()],
+            })
+
+        # NDJSON: satu baris per anak sesuai urutan masukan, dikirim bertahap.
+        def baris_ndjson():
+            potongan = []
+            for i in range(len(data)):
+                if i in hasil_per_indeks:
+                    isi = {'indeks': i, **dict(zip(KOLOM_BULK, hasil_per_indeks[i]))}
+                else:
+                    isi = {'indeks': i, 'errors': galat_item[i]}
+                potongan.append(json.dumps(isi, ensure_ascii=False, separators=(',', ':')))
+                if len(potongan) == BARIS_PER_POTONGAN:
+                    yield ('\n'.join(potongan) + '\n').encode('utf-8')
+                    potongan = []
+            if potongan:
+                yield ('\n'.join(potongan) + '\n').encode('utf-8')
+
+        isi = baris_ndjson()
+        headers = {'Vary': 'Accept-Encoding'}
+        if _terima_gzip():
+            isi = _gzip_bertahap(isi)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(stream_with_context(isi), mimetype='application/x-ndjson', headers=headers)
+
+    return api
@@ -1,152 +1,84 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, Response, url_for, jsonify, g, stream_with_context
 from datetime import datetime
-import pandas as pd
-import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
+import time
 import os
+from inferensi import model_bersama, SARAN
+from batch import skrining_batch, simpan_batch
+from storage import buat_storage, UKURAN_HALAMAN
+from antrian import AntrianSimpan, ANTRIAN_DIDUKUNG
+from growth import buat_id_anak
+from statistik import kelompokkan, KELOMPOK_UMUR
+from ekspor import aliran_ekspor, MIMETYPE
+from api import buat_api, VERSI_API
+import metrics
+from metrics import ukur
+from profiler import sampler, DIIZINKAN as PROFILER_DIIZINKAN
 
 app = Flask(__name__)
+BATAS_HALAMAN_MAKS = 500
+
+
+def _batas_halaman():
+    # Negatif berarti tanpa LIMIT di SQLite, jadi batas selalu 1..maks.
+    return max(1, min(request.args.get('batas', UKURAN_HALAMAN, type=int), BATAS_HALAMAN_MAKS))
+
 
 class StuntingAI:
-    def __init__(self):
+    def __init__(self, engine=None):
         print("Sedang memuat data WHO...")
         try:
 
-            self.wfa_boys = pd.read_csv('dataset/wfa_boys_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            self.wfa_girls = pd.read_csv('dataset/wfa_girls_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            self.lhfa_boys = pd.read_csv('dataset/lhfa_boys_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            self.lhfa_girls = pd.read_csv('dataset/lhfa_girls_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            
-            if 'c' in self.lhfa_boys.columns: self.lhfa_boys.rename(columns={'c': 'Month'}, inplace=True)
-            if 'c' in self.lhfa_girls.columns: self.lhfa_girls.rename(columns={'c': 'Month'}, inplace=True)
+            self.storage = buat_storage()
+            # Write-behind: hasil dikembalikan tanpa menunggu penulisan ke disk.
+            aktif = ANTRIAN_DIDUKUNG and os.environ.get('STUNTING_ANTRIAN', '1') != '0'
+            self.antrian = AntrianSimpan(self.storage) if aktif else None
             
             print("Menyiapkan Logika Fuzzy...")
-            self.simulasi = self.set_up_fuzzy_system()
+            self.model = model_bersama(engine)
+            jumlah_panas = int(os.environ.get('STUNTING_PANASKAN_CACHE', 0))
+            if jumlah_panas > 0:
+                terisi = self.model.panaskan_cache(self.storage.tupel_terbanyak(jumlah_panas))
+                print(f"Cache asesmen diisi {terisi} data tersering dari riwayat")
             print("Sistem AI SIAP!")
         except FileNotFoundError:
             print("Error: File dataset tidak ditemukan. Pastikan folder 'dataset' ada.")
 
-    def set_up_fuzzy_system(self):
-        z_tb  = ctrl.Antecedent(np.arange(-5, 6, 0.1), 'stunting_score')
-        z_bb  = ctrl.Antecedent(np.arange(-5, 6, 0.1), 'gizi_score')
-        output = ctrl.Consequent(np.arange(0, 101, 1), 'kondisi_anak')
-
-        z_tb['sangat_pendek'] = fuzz.trapmf(z_tb.universe, [-5, -5, -3.1, -2.9])
-        z_tb['pendek']        = fuzz.trimf(z_tb.universe, [-3.1, -2.5, -1.9])
-        z_tb['normal']        = fuzz.trapmf(z_tb.universe, [-2.1, -1, 3, 5])
-
-        z_bb['gizi_buruk']  = fuzz.trapmf(z_bb.universe, [-5, -5, -3.1, -2.9])
-        z_bb['gizi_kurang'] = fuzz.trimf(z_bb.universe, [-3.1, -2.5, -1.9])
-        z_bb['gizi_baik']   = fuzz.trapmf(z_bb.universe, [-2.1, 0, 1.9, 2.1])
-        z_bb['gizi_lebih']  = fuzz.trapmf(z_bb.universe, [1.9, 2.1, 5, 5])
-
-        output['severely_stunted'] = fuzz.trimf(output.universe, [0, 0, 45])
-        output['stunted']          = fuzz.trimf(output.universe, [40, 60, 80])
-        output['normal']           = fuzz.trimf(output.universe, [75, 100, 100])
-
-        rule1 = ctrl.Rule(z_tb['sangat_pendek'] | z_bb['gizi_buruk'], output['severely_stunted'])
-        rule2 = ctrl.Rule(z_tb['pendek'] & z_bb['gizi_baik'], output['stunted'])
-        rule3 = ctrl.Rule(z_tb['normal'] & z_bb['gizi_kurang'], output['stunted'])
-        rule4 = ctrl.Rule(z_tb['normal'] & z_bb['gizi_baik'], output['normal'])
-        rule5 = ctrl.Rule(z_tb['pendek'] & z_bb['gizi_kurang'], output['severely_stunted'])
-        rule6 = ctrl.Rule(z_tb['sangat_pendek'] & z_bb['gizi_lebih'], output['stunted'])
-            
-        simulasi = ctrl.ControlSystemSimulation(ctrl.ControlSystem([rule1, rule2, rule3, rule4, rule5, rule6]))
-        return simulasi
-
     def hitung_z_tb_u(self, gender, umur, tinggi):
-        if gender.lower() == 'laki-laki': std_data = self.lhfa_boys
-        else: std_data = self.lhfa_girls
-        
-        row = std_data[std_data['Month'] == umur]
-        if row.empty: return 0
-        L, M, S = row['L'].values[0], row['M'].values[0], row['S'].values[0]
-        return ((tinggi / M) ** L - 1) / (S * L)
+        return self.model.z_score('lhfa', gender, umur, tinggi)
 
     def hitung_z_bb_u(self, gender, umur, berat):
-        if gender.lower() == 'laki-laki': 
-            std_data = self.wfa_boys
-        else: 
-            std_data = self.wfa_girls
-
-        row = std_data[std_data['Month'] == umur]
-        if row.empty: 
-            return 0
-        L, M, S = row['L'].values[0], row['M'].values[0], row['S'].values[0]
-        return ((berat / M) ** L - 1) / (S * L)
+        return self.model.z_score('wfa', gender, umur, berat)
 
     def simpan_data(self, data_dict):
         data_to_save = data_dict.copy()
         if 'saran' in data_to_save:
             del data_to_save['saran']
 
-        nama_file = 'dataset/laporan_hasil.csv' 
-        
-        df_baru = pd.DataFrame([data_to_save])
+        with ukur('simpan'):
+            if self.antrian is not None:
+                return self.antrian.simpan(data_to_save)
+            return self.storage.simpan(data_to_save)
 
-        if not os.path.isfile(nama_file):
-            df_baru.to_csv(nama_file, index=False)
-        else:
-            df_baru.to_csv(nama_file, mode='a', header=False, index=False)
-
-    def analisa_kesehatan(self, nama, gender, umur_bulan, tinggi, berat, umur_input_asli, tipe_umur):
-        z_tinggi = self.hitung_z_tb_u(gender, umur_bulan, tinggi)
-        z_berat  = self.hitung_z_bb_u(gender, umur_bulan, berat)
-        
-        z_tinggi_input = max(min(z_tinggi, 5), -5)
-        z_berat_input  = max(min(z_berat, 5), -5)
-        
-        self.simulasi.input['stunting_score'] = z_tinggi_input
-        self.simulasi.input['gizi_score']     = z_berat_input
-        
-        try:
-            self.simulasi.compute()
-            skor_akhir = self.simulasi.output['kondisi_anak']
-        except:
-            skor_akhir = 0
+    def analisa_kesehatan(self, nama, gender, umur_bulan, tinggi, berat, umur_input_asli, tipe_umur, id_anak=None):
+        with ukur('inferensi'):
+            hasil = self.model.inferensi(gender, umur_bulan, tinggi, berat)
+        z_tinggi, z_berat, skor_akhir = hasil.z_tb, hasil.z_bb, hasil.skor
 
         if tipe_umur == 'tahun':
             umur_display = f"{umur_input_asli} Tahun ({umur_bulan:.1f} Bulan)"
         else:
             umur_display = f"{umur_bulan} Bulan"
 
-        saran_list = []
-        warna_css = ''
-        
-        if skor_akhir < 45:
-            kesimpulan = 'Severely Stunted (Stunting Berat)'
-            warna_css = 'danger' 
-            saran_list = [
-                "SEGERA rujuk ke Rumah Sakit atau Dokter Spesialis Anak.",
-                "Pemberian Pangan Olahan untuk Keperluan Medis Khusus (PKMK) di bawah pengawasan dokter.",
-                "Investigasi penyakit penyerta (seperti TBC, infeksi berulang) yang menghambat pertumbuhan.",
-                "Pemantauan pertumbuhan secara intensif setiap minggu."
-            ]
-        elif skor_akhir < 75:
-            kesimpulan = 'Stunted (Stunting)'
-            warna_css = 'warning'
-            saran_list = [
-                "Evaluasi pola makan: Wajib tambahkan satu porsi protein hewani (telur, ikan, ayam, daging) setiap kali makan.",
-                "Berikan Pemberian Makanan Tambahan (PMT) tinggi kalori dan protein.",
-                "Suplementasi mikronutrien (Taburia, Zinc, Vitamin A) sesuai anjuran Puskesmas/Posyandu.",
-                "Cek sanitasi lingkungan (air bersih dan jamban) serta perilaku hidup bersih."
-            ]
-        else:
-            kesimpulan = 'Normal'
-            warna_css = 'success'
-            saran_list = [
-                "Pertahankan pola makan gizi seimbang (Isi Piringku).",
-                "Lanjutkan pemantauan pertumbuhan rutin di Posyandu setiap bulan.",
-                "Pastikan imunisasi dasar dan lanjutan lengkap.",
-                "Jaga kebersihan diri dan lingkungan untuk mencegah infeksi."
-            ]
+        # Kelas dan warna dari model (BATAS_KLASIFIKASI), sama dengan jalur batch.
+        kesimpulan, warna_css = hasil.kesimpulan, hasil.warna
+        saran_list = SARAN[kesimpulan]
 
         data_hasil = {
             'Tanggal': datetime.now().strftime("%Y-%m-%d %H:%M"),
             'nama': nama,
             'JK': gender,
             'Umur_Display': umur_display,
+            'Umur_Bulan': umur_bulan,
             'Tinggi_cm': tinggi,
             'Berat_kg': berat,
             'Z_Score_TB': round(z_tinggi, 2),
@@ -154,13 +86,64 @@ class StuntingAI:
             'Skor_Fuzzy': round(skor_akhir, 2),
             'Kesimpulan': kesimpulan,
             'warna': warna_css,    
-            'saran': saran_list
+            'saran': saran_list,
+            'id_anak': buat_id_anak(nama, gender, id_anak)
         }
         
-        self.simpan_data(data_hasil)
+        metrics.tambah('stunting_asesmen_total', kesimpulan=kesimpulan)
+        data_hasil['pertumbuhan'] = self.simpan_data(data_hasil)
         return data_hasil
 
 ai_system = StuntingAI()
+app.register_blueprint(buat_api(ai_system), url_prefix=f'/api/{VERSI_API}')
+
+def _metrik_cache():
+    if ai_system.model.cache is None:
+        return []
+    st = ai_system.model.cache.statistik()
+    return [
+        ('stunting_cache_asesmen_total', 'counter', "Pencarian cache asesmen per hasil (hit, miss, lewat)",
+         [({'hasil': k}, st[k]) for k in ('hit', 'miss', 'lewat')]),
+        ('stunting_cache_asesmen_eviksi_total', 'counter', "Entri cache asesmen yang dibuang (LRU)",
+         [({}, st['eviksi'])]),
+        ('stunting_cache_asesmen_isi', 'gauge', "Jumlah entri cache asesmen", [({}, st['isi'])]),
+    ]
+
+def _metrik_antrian():
+    if ai_system.antrian is None:
+        return []
+    st = ai_system.antrian.statistik()
+    return [
+        ('stunting_antrian_isi', 'gauge', "Pemeriksaan yang menunggu ditulis ke penyimpanan", [({}, st['antre'])]),
+        ('stunting_antrian_tertulis_total', 'counter', "Pemeriksaan yang sudah ditulis oleh antrian",
+         [({}, st['tertulis'])]),
+    ]
+
+metrics.daftarkan_pengumpul(_metrik_cache)
+metrics.daftarkan_pengumpul(_metrik_antrian)
+
+@app.before_request
+def periksa_aturan():
+    # Aturan fuzzy di-hot-reload bila file konfigurasinya berubah.
+    ai_system.model.periksa_aturan()
+
+if metrics.AKTIF:
+    @app.before_request
+    def mulai_ukur():
+        g.mulai_request = time.perf_counter()
+
+    @app.after_request
+    def catat_request(response):
+        route = request.url_rule.rule if request.url_rule else 'lainnya'
+        metrics.amati('stunting_durasi_request_detik', time.perf_counter() - g.mulai_request,
+                      route=route, method=request.method)
+        metrics.tambah('stunting_request_total', route=route, method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def catat_galat(exc):
+        if exc is not None:
+            metrics.tambah('stunting_galat_total', tahap='request')
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -173,6 +156,7 @@ def index():
             umur_input = float(request.form['umur'])
             tinggi = float(request.form['tinggi'])
             berat = float(request.form['berat'])
+            id_anak = request.form.get('id_anak')
 
             umur_bulan = umur_input if tipe_umur == 'bulan' else umur_input * 12
             
@@ -180,42 +164,161 @@ def index():
                 error_msg = "Umur harus antara 0 - 60 bulan (5 Tahun)."
                 return render_template('index.html', error=error_msg)
 
-            hasil = ai_system.analisa_kesehatan(nama, gender, umur_bulan, tinggi, berat, umur_input, tipe_umur)
+            hasil = ai_system.analisa_kesehatan(nama, gender, umur_bulan, tinggi, berat, umur_input, tipe_umur, id_anak)
             
         except ValueError:
+            metrics.tambah('stunting_galat_total', tahap='validasi')
             return render_template('index.html', error="Pastikan input angka valid.")
         except Exception as e:
+            metrics.tambah('stunting_galat_total', tahap='asesmen')
             return render_template('index.html', error=f"Terjadi kesalahan: {e}")
 
-    return render_template('index.html', hasil=hasil)
+    with ukur('render'):
+        return render_template('index.html', hasil=hasil)
+
+@app.route('/batch', methods=['POST'])
+def skrining_massal():
+    import pandas as pd
+
+    berkas = request.files.get('berkas')
+    if berkas is None or berkas.filename == '':
+        return render_template('index.html', error="Pilih file CSV data anak terlebih dahulu.")
+
+    try:
+        hasil = skrining_batch(ai_system, pd.read_csv(berkas))
+    except ValueError as e:
+        return render_template('index.html', error=f"File tidak valid: {e}")
+    except Exception as e:
+        return render_template('index.html', error=f"Terjadi kesalahan: {e}")
+
+    simpan_batch(hasil, ai_system.storage)
+    nama_unduhan = os.path.splitext(berkas.filename)[0] + '_hasil.csv'
+    return Response(hasil.to_csv(index=False), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={nama_unduhan}'})
 
 @app.route('/database')
 def lihat_database():
-    path_file = 'dataset/laporan_hasil.csv'
-    data_pasien = []
-    
-    if not os.path.exists(path_file):
-        print(f"[DEBUG] File tidak ditemukan di: {os.path.abspath(path_file)}")
-        return render_template('database.html', data=[]) 
-    
+    filter_aktif = {k: request.args.get(k, '').strip()
+                    for k in ('kesimpulan', 'jk', 'umur', 'dari', 'sampai', 'cari')}
+    umur_min, umur_max = KELOMPOK_UMUR.get(filter_aktif['umur'], (None, None))
+    # Kursor halaman: (tanggal, id) baris terakhir halaman sebelumnya.
+    sebelum_id = request.args.get('sebelum', type=int)
+    sebelum_tanggal = request.args.get('sebelum_tanggal')
+    sebelum = (sebelum_tanggal, sebelum_id) if sebelum_id is not None and sebelum_tanggal else None
+
+    data_pasien, lanjut = [], None
     try:
-        df = pd.read_csv(path_file)
-        print(f"[DEBUG] File ditemukan. Jumlah baris: {len(df)}")
-
-        required_columns = ['warna', 'Kesimpulan', 'Umur_Display']
-        for col in required_columns:
-            if col not in df.columns:
-                print(f"[DEBUG] Kolom '{col}' tidak ada (Mungkin data lama). Mengisi default.")
-                df[col] = '-' 
-                if col == 'warna': df[col] = 'light' 
-
-        df = df.iloc[::-1]
-        data_pasien = df.to_dict(orient='records')
-        print("[DEBUG] Data berhasil diproses ke dictionary.")
-        
+        with ukur('baca_database'):
+            data_pasien, lanjut = ai_system.storage.halaman(
+                batas=_batas_halaman(),
+                sebelum=sebelum,
+                kesimpulan=filter_aktif['kesimpulan'] or None,
+                jk=filter_aktif['jk'] or None,
+                umur_min=umur_min,
+                umur_max=umur_max,
+                dari=filter_aktif['dari'] or None,
+                sampai=filter_aktif['sampai'] or None,
+                cari=filter_aktif['cari'] or None,
+            )
+        for row in data_pasien:
+            row['Kesimpulan'] = row.get('Kesimpulan') or '-'
+            row['Umur_Display'] = row.get('Umur_Display') or '-'
+            row['warna'] = row.get('warna') or 'light'
     except Exception as e:
-        print(f"[ERROR] Gagal membaca CSV: {e}")
-    return render_template('database.html', data=data_pasien)
+        metrics.tambah('stunting_galat_total', tahap='baca_database')
+        print(f"[ERROR] Gagal membaca database: {e}")
+
+    param = {k: v for k, v in filter_aktif.items() if v}
+    url_lanjut = (url_for('lihat_database', sebelum_tanggal=lanjut[0], sebelum=lanjut[1], **param)
+                  if lanjut else None)
+    url_awal = url_for('lihat_database', **param) if sebelum else None
+    with ukur('render'):
+        return render_template('database.html', data=data_pasien, filter=filter_aktif,
+                               kelompok_umur=KELOMPOK_UMUR, url_lanjut=url_lanjut, url_awal=url_awal)
+
+@app.route('/anak/<path:id_anak>')
+def riwayat_anak(id_anak):
+    status = ai_system.storage.status_anak(id_anak)
+    riwayat = ai_system.storage.riwayat_anak(id_anak)
+    return render_template('anak.html', status=status, riwayat=riwayat, id_anak=id_anak)
+
+@app.route('/faltering')
+def daftar_faltering():
+    daftar = ai_system.storage.anak_faltering(_batas_halaman())
+    return render_template('faltering.html', daftar=daftar)
+
+def _ringkasan_statistik():
+    periode = request.args.get('periode') or None
+    daftar = ai_system.storage.statistik()
+    terpilih = [a for a in daftar if a['periode'] == periode] if periode else daftar
+    return {
+        'periode': periode,
+        'daftar_periode': sorted({a['periode'] for a in daftar}),
+        'per_periode': kelompokkan(daftar, 'periode'),
+        'per_jk': kelompokkan(terpilih, 'jk'),
+        'per_umur': kelompokkan(terpilih, 'kelompok_umur'),
+    }
+
+@app.route('/statistik')
+def dashboard_statistik():
+    return render_template('statistik.html', **_ringkasan_statistik())
+
+@app.route('/statistik.json')
+def statistik_json():
+    ringkasan = _ringkasan_statistik()
+    for k in ('per_periode', 'per_jk', 'per_umur'):
+        ringkasan[k] = dict(ringkasan[k])
+    return jsonify(ringkasan)
+
+@app.route('/ekspor')
+def ekspor_riwayat():
+    format = request.args.get('format', 'csv')
+    if format not in MIMETYPE:
+        return jsonify(error=f"Format harus salah satu dari: {', '.join(MIMETYPE)}"), 400
+    filter_ekspor = {k: request.args.get(k) or None for k in ('dari', 'sampai', 'kesimpulan')}
+    try:
+        isi = aliran_ekspor(ai_system.storage, format, **filter_ekspor)
+    except RuntimeError as e:
+        return jsonify(error=str(e)), 501
+    nama_file = f"riwayat_pemeriksaan.{'ndjson' if format == 'ndjson' else format}"
+    return Response(stream_with_context(isi), mimetype=MIMETYPE[format],
+                    headers={'Content-Disposition': f'attachment; filename={nama_file}'})
+
+@app.route('/aturan', methods=['GET', 'POST'])
+def aturan_fuzzy():
+    # POST memuat ulang file aturan sekarang juga (hanya di worker ini;
+    # worker lain menyusul lewat pemeriksaan berkala).
+    if request.method == 'POST':
+        try:
+            ai_system.model.muat_ulang_aturan()
+        except (OSError, ValueError) as e:
+            return jsonify(error=str(e), **ai_system.model.status_aturan), 422
+    return jsonify(ai_system.model.status_aturan)
+
+@app.route('/metrics')
+def ekspor_metrics():
+    return Response(metrics.ekspor(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/profiler', methods=['GET', 'POST'])
+def kendali_profiler():
+    # Opt-in: hanya aktif bila server dijalankan dengan STUNTING_PROFILER=1.
+    if not PROFILER_DIIZINKAN:
+        return jsonify(error="Profiler tidak diizinkan (set STUNTING_PROFILER=1)"), 403
+    if request.method == 'GET':
+        if request.args.get('format') == 'collapsed':
+            return Response(sampler.collapsed(request.args.get('batas', type=int)), mimetype='text/plain')
+        return jsonify(sampler.status())
+
+    aksi = request.values.get('aksi', '')
+    if aksi == 'mulai':
+        sampler.mulai(request.values.get('interval', type=float))
+    elif aksi == 'berhenti':
+        sampler.berhenti()
+    elif aksi == 'reset':
+        sampler.reset()
+    else:
+        return jsonify(error="aksi harus salah satu dari: mulai, berhenti, reset"), 400
+    return jsonify(sampler.status())
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Basis aturan fuzzy (fungsi keanggotaan dan rule) dibaca dari file JSON,
+# bukan ditulis di kode. Hasil baca_aturan() sudah divalidasi dan berisi
+# rule dalam bentuk pohon ('term', variabel, term) / ('and'|'or', a, b) /
+# ('not', a) yang dipakai MamdaniEvaluator maupun skfuzzy.
+PATH_ATURAN = os.environ.get('STUNTING_ATURAN', 'dataset/aturan_fuzzy.json')
+VARIABEL_INPUT = ('stunting_score', 'gizi_score')
+OPERATOR = {'dan': 'and', 'atau': 'or', 'bukan': 'not'}
+# Batas titik per universe: langkah yang sangat kecil membuat np.arange
+# menghabiskan memori sebelum aturan sempat ditolak.
+MAKS_TITIK_UNIVERSE = 10000
+
+
+def trimf(x, abc):
+    # Sama persis dengan skfuzzy.trimf agar permukaan terkompilasi identik.
+    a, b, c = abc
+    y = np.zeros(len(x))
+    if a != b:
+        idx = (a < x) & (x < b)
+        y[idx] = (x[idx] - a) / float(b - a)
+    if b != c:
+        idx = (b < x) & (x < c)
+        y[idx] = (c - x[idx]) / float(c - b)
+    y[x == b] = 1
+    return y
+
+
+def trapmf(x, abcd):
+    a, b, c, d = abcd
+    y = np.ones(len(x))
+    idx = x <= b
+    y[idx] = trimf(x[idx], (a, b, b))
+    idx = x >= c
+    y[idx] = trimf(x[idx], (c, c, d))
+    y[(x < a) | (x > d)] = 0
+    return y
+
+
+FUNGSI_KEANGGOTAAN = {'trimf': (trimf, 3), 'trapmf': (trapmf, 4)}
+
+
+def universe(spek):
+    return np.arange(*spek['universe'])
+
+
+def keanggotaan(spek):
+    x = universe(spek)
+    return {t: FUNGSI_KEANGGOTAAN[fungsi][0](x, parameter) for t, (fungsi, parameter) in spek['term'].items()}
+
+
+def _angka(nilai):
+    return isinstance(nilai, (int, float)) and not isinstance(nilai, bool) and np.isfinite(nilai)
+
+
+def _cek_variabel(nama, spek, galat):
+    if not isinstance(spek, dict) or set(spek) != {'universe', 'term'}:
+        galat.append(f"{nama}: harus berisi 'universe' dan 'term'")
+        return
+    u = spek['universe']
+    if not (isinstance(u, list) and len(u) == 3 and all(_angka(v) for v in u) and u[2] > 0 and u[1] > u[0]):
+        galat.append(f"{nama}: universe harus [awal, akhir, langkah] dengan akhir > awal dan langkah > 0")
+        return
+    if (u[1] - u[0]) / u[2] > MAKS_TITIK_UNIVERSE:
+        galat.append(f"{nama}: universe maksimal {MAKS_TITIK_UNIVERSE} titik")
+        return
+    if not isinstance(spek['term'], dict) or not spek['term']:
+        galat.append(f"{nama}: term kosong")
+        return
+    x = universe(spek)
+    for term, isi in spek['term'].items():
+        if not (isinstance(isi, list) and len(isi) == 2 and isi[0] in FUNGSI_KEANGGOTAAN):
+            galat.append(f"{nama}.{term}: harus [fungsi, parameter] dengan fungsi {', '.join(FUNGSI_KEANGGOTAAN)}")
+            continue
+        fungsi, parameter = isi
+        if not (isinstance(parameter, list) and len(parameter) == FUNGSI_KEANGGOTAAN[fungsi][1]
+                and all(_angka(p) for p in parameter)):
+            galat.append(f"{nama}.{term}: {fungsi} membutuhkan {FUNGSI_KEANGGOTAAN[fungsi][1]} angka")
+        elif parameter != sorted(parameter):
+            galat.append(f"{nama}.{term}: parameter harus urut naik")
+        elif FUNGSI_KEANGGOTAAN[fungsi][0](x, parameter).max() <= 0:
+            galat.append(f"{nama}.{term}: tidak pernah bernilai > 0 di dalam universe")
+
+
+def _pohon(ekspresi, inputs, galat, posisi):
+    if not isinstance(ekspresi, dict) or len(ekspresi) != 1:
+        galat.append(f"{posisi}: ekspresi harus objek dengan tepat satu kunci")
+        return None
+    (kunci, isi), = ekspresi.items()
+    if kunci in ('dan', 'atau'):
+        if not isinstance(isi, list) or len(isi) < 2:
+            galat.append(f"{posisi}: '{kunci}' membutuhkan minimal dua ekspresi")
+            return None
+        anak = [_pohon(e, inputs, galat, posisi) for e in isi]
+        if None in anak:
+            return None
+        node = anak[0]
+        for berikut in anak[1:]:
+            node = (OPERATOR[kunci], node, berikut)
+        return node
+    if kunci == 'bukan':
+        anak = _pohon(isi, inputs, galat, posisi)
+        return None if anak is None else ('not', anak)
+    if kunci not in inputs:
+        galat.append(f"{posisi}: variabel input '{kunci}' tidak dikenal")
+        return None
+    if isi not in inputs[kunci]['term']:
+        galat.append(f"{posisi}: term '{isi}' tidak ada di {kunci}")
+        return None
+    return ('term', kunci, isi)
+
+
+def validasi_aturan(data, sha256=None):
+    # Mengembalikan konfigurasi siap pakai; ValueError berisi semua galat.
+    galat = []
+    if not isinstance(data, dict) or set(data) != {'input', 'output', 'aturan'}:
+        raise ValueError("Konfigurasi aturan harus berisi tepat 'input', 'output' dan 'aturan'")
+
+    inputs = data['input']
+    if not isinstance(inputs, dict) or set(inputs) != set(VARIABEL_INPUT):
+        galat.append(f"input harus tepat: {', '.join(VARIABEL_INPUT)}")
+        inputs = {}
+    for nama, spek in inputs.items():
+        _cek_variabel(nama, spek, galat)
+
+    output = data['output']
+    if not isinstance(output, dict) or len(output) != 1:
+        galat.append("output harus berisi tepat satu variabel")
+        output = {}
+    for nama, spek in output.items():
+        _cek_variabel(nama, spek, galat)
+    if galat:
+        raise ValueError("Konfigurasi aturan tidak valid: " + '; '.join(galat))
+    (nama_output, spek_output), = output.items()
+
+    if not isinstance(data['aturan'], list) or not data['aturan']:
+        raise ValueError("Konfigurasi aturan tidak valid: daftar aturan kosong")
+    aturan = []
+    for i, rule in enumerate(data['aturan'], 1):
+        posisi = f"aturan {i}"
+        if not isinstance(rule, dict) or not {'jika', 'maka'} <= set(rule) <= {'jika', 'maka', 'bobot'}:
+            galat.append(f"{posisi}: harus berisi 'jika', 'maka' dan opsional 'bobot'")
+            continue
+        pohon = _pohon(rule['jika'], inputs, galat, posisi)
+        if rule['maka'] not in spek_output['term']:
+            galat.append(f"{posisi}: term output '{rule['maka']}' tidak ada di {nama_output}")
+            continue
+        bobot = rule.get('bobot', 1.0)
+        if not _angka(bobot) or not 0 < bobot <= 1:
+            galat.append(f"{posisi}: bobot harus di antara 0 dan 1")
+            continue
+        if pohon is not None:
+            aturan.append((pohon, rule['maka'], float(bobot)))
+    if galat:
+        raise ValueError("Konfigurasi aturan tidak valid: " + '; '.join(galat))
+
+    return {'input': inputs, 'output': (nama_output, spek_output), 'aturan': aturan, 'sha256': sha256}
+
+
+def hash_file(path=None):
+    with open(path or PATH_ATURAN, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def baca_aturan(path=None):
+    # File dibaca sekali; hash dihitung dari isi yang sama dengan yang
+    # divalidasi sehingga sidik model selalu cocok dengan rule yang dipakai.
+    with open(path or PATH_ATURAN, 'rb') as f:
+        isi = f.read()
+    try:
+        data = json.loads(isi)
+    except ValueError as e:
+        raise ValueError(f"File aturan bukan JSON yang valid: {e}")
+    return validasi_aturan(data, hashlib.sha256(isi).hexdigest())
@@ -0,0 +1,116 @@
+from datetime import datetime
+import numpy as np
+
+KOLOM_ALIAS = {
+    'nama': ['nama', 'Nama'],
+    'gender': ['gender', 'JK', 'jk', 'Jenis_Kelamin'],
+    'umur': ['umur', 'Umur_Bulan', 'umur_bulan'],
+    'tinggi': ['tinggi', 'Tinggi_cm', 'tinggi_cm'],
+    'berat': ['berat', 'Berat_kg', 'berat_kg'],
+    'id_anak': ['id_anak', 'ID_Anak', 'no_kia'],
+}
+
+# Penulisan jenis kelamin yang umum di roster posyandu; nilai lain ditandai
+# 'Data tidak valid' alih-alih dihitung dengan tabel WHO yang salah.
+ALIAS_GENDER = {
+    'laki-laki': 'laki-laki', 'laki laki': 'laki-laki', 'laki': 'laki-laki', 'l': 'laki-laki',
+    'lk': 'laki-laki', 'pria': 'laki-laki', 'male': 'laki-laki', 'm': 'laki-laki',
+    'perempuan': 'perempuan', 'p': 'perempuan', 'pr': 'perempuan', 'wanita': 'perempuan',
+    'female': 'perempuan', 'f': 'perempuan',
+}
+
+KOLOM_LAPORAN = ['Tanggal', 'nama', 'JK', 'Umur_Display', 'Umur_Bulan', 'Tinggi_cm', 'Berat_kg',
+                 'Z_Score_TB', 'Z_Score_BB', 'Skor_Fuzzy', 'Kesimpulan', 'warna', 'id_anak']
+
+
+def _ambil_kolom(df, nama):
+    for alias in KOLOM_ALIAS[nama]:
+        if alias in df.columns:
+            return df[alias]
+    raise ValueError(f"Kolom '{nama}' tidak ditemukan. Gunakan salah satu: {', '.join(KOLOM_ALIAS[nama])}")
+
+
+def populasi_sintetis(n, referensi, seed=0):
+    # Roster acak umur 0-60 bulan (20% umur pecahan), kedua jenis kelamin.
+    # Z-score diambil acak lalu dikembalikan ke cm/kg lewat LMS sehingga
+    # semua kategori status gizi ikut terwakili.
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    umur = np.where(rng.random(n) < 0.8, rng.integers(0, 61, n), np.round(rng.uniform(0, 60, n), 1))
+    gender = rng.choice(['laki-laki', 'perempuan'], n)
+
+    def ukuran(indikator, z):
+        L, M, S = np.moveaxis(referensi.nilai(indikator, gender, umur), -1, 0)
+        return M * (1 + L * S * z) ** (1 / L)
+
+    return pd.DataFrame({
+        'nama': [f'anak{i}' for i in range(n)],
+        'gender': gender,
+        'umur': umur,
+        'tinggi': np.round(ukuran('lhfa', rng.normal(-0.9, 1.3, n)), 1),
+        'berat': np.round(ukuran('wfa', rng.normal(-0.6, 1.3, n)), 1),
+    })
+
+
+def skrining_batch(ai, data):
+    import pandas as pd
+
+    df = data if isinstance(data, pd.DataFrame) else pd.read_csv(data)
+
+    nama = _ambil_kolom(df, 'nama').astype(str).to_numpy()
+    gender = _ambil_kolom(df, 'gender').astype(str).str.strip().str.lower()
+    gender = gender.map(ALIAS_GENDER).fillna(gender).to_numpy()
+    gender_valid = np.isin(gender, ('laki-laki', 'perempuan'))
+    umur_input = pd.to_numeric(_ambil_kolom(df, 'umur'), errors='coerce').to_numpy(dtype=float)
+    tinggi = pd.to_numeric(_ambil_kolom(df, 'tinggi'), errors='coerce').to_numpy(dtype=float)
+    berat = pd.to_numeric(_ambil_kolom(df, 'berat'), errors='coerce').to_numpy(dtype=float)
+
+    try:
+        id_anak = _ambil_kolom(df, 'id_anak').fillna('').astype(str).str.strip()
+    except ValueError:
+        id_anak = pd.Series('', index=df.index)
+    id_otomatis = (pd.Series(nama).str.lower().str.split().str.join(' ') + '|' + pd.Series(gender)).to_numpy()
+    id_anak = np.where(id_anak.to_numpy() != '', id_anak.to_numpy(), id_otomatis)
+
+    if 'tipe_umur' in df.columns:
+        tahun = df['tipe_umur'].astype(str).str.lower().to_numpy() == 'tahun'
+    else:
+        tahun = np.zeros(len(df), dtype=bool)
+    umur = np.where(tahun, umur_input * 12, umur_input)
+
+    valid = (gender_valid & np.isfinite(umur) & np.isfinite(tinggi) & np.isfinite(berat)
+             & (umur >= 0) & (umur <= 60) & (tinggi > 0) & (berat > 0))
+
+    hasil = ai.model.inferensi_batch(np.where(gender_valid, gender, 'perempuan'), umur, tinggi, berat)
+    z_tb = np.where(valid, hasil['z_tb'], np.nan)
+    z_bb = np.where(valid, hasil['z_bb'], np.nan)
+    skor = np.where(valid, hasil['skor'], np.nan)
+    kesimpulan = np.where(valid, hasil['kesimpulan'], 'Data tidak valid')
+    warna = np.where(valid, hasil['warna'], 'secondary')
+
+    umur_str = pd.Series(umur).round(1).astype(str)
+    umur_display = np.where(tahun,
+                            pd.Series(umur_input).astype(str) + ' Tahun (' + umur_str + ' Bulan)',
+                            pd.Series(umur).astype(str) + ' Bulan')
+
+    return pd.DataFrame({
+        'Tanggal': datetime.now().strftime("%Y-%m-%d %H:%M"),
+        'nama': nama,
+        'JK': gender,
+        'Umur_Display': umur_display,
+        'Umur_Bulan': umur,
+        'Tinggi_cm': tinggi,
+        'Berat_kg': berat,
+        'Z_Score_TB': np.round(z_tb, 2),
+        'Z_Score_BB': np.round(z_bb, 2),
+        'Skor_Fuzzy': np.round(skor, 2),
+        'Kesimpulan': kesimpulan,
+        'warna': warna,
+        'id_anak': id_anak,
+    }, columns=KOLOM_LAPORAN)
+
+
+def simpan_batch(hasil, storage):
+    valid = hasil[hasil['Kesimpulan'] != 'Data tidak valid']
+    return storage.simpan_banyak(valid.to_dict(orient='records'))
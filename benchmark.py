@@ -0,0 +1,311 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# Benchmark kinerja dan uji regresi keluaran klinis. Waktu startup diukur di
+# proses terpisah agar import dan cache dari pengukuran sebelumnya tidak
+# ikut terhitung; tahap lain diukur di proses ini dengan penyimpanan sementara.
+DIR_PROYEK = os.path.dirname(os.path.abspath(__file__))
+PATH_GOLDEN = os.path.join(DIR_PROYEK, 'dataset', 'golden_skrining.csv')
+
+SKRIP_STARTUP = {
+    'import_inferensi': "import inferensi",
+    'muat_model': "import inferensi; inferensi.ModelStunting.muat()",
+    'import_app': "import app",
+}
+
+TAHAP = ['lms', 'fuzzy', 'simpan', 'http', 'startup']
+
+# Toleransi regresi terhadap golden output (dibuat dengan engine exact, yaitu
+# jalur skfuzzy asli). Z-score dan Kesimpulan harus identik; skor fuzzy boleh
+# berbeda sebesar toleransi engine. Untuk compiled, galat maksimum pada kisi
+# rapat (FuzzyEngineCompiled.galat_maksimum) adalah 0,52 di resolusi 0,05;
+# toleransi 1,0 memberi ruang untuk titik di antara kisi tersebut.
+TOLERANSI_Z = 1e-9
+TOLERANSI_SKOR = {'exact': 1e-6, 'compiled': 1.0}
+
+
+def _jalankan(kode, env):
+    skrip = f"import time; t = time.perf_counter(); {kode}; print(time.perf_counter() - t)"
+    hasil = subprocess.run([sys.executable, '-c', skrip], cwd=DIR_PROYEK, env=env,
+                           capture_output=True, text=True, check=True)
+    return float(hasil.stdout.strip().splitlines()[-1])
+
+
+def _modul_berat(env):
+    skrip = "import sys, app; print(' '.join(m for m in ('pandas', 'skfuzzy') if m in sys.modules) or '-')"
+    hasil = subprocess.run([sys.executable, '-c', skrip], cwd=DIR_PROYEK, env=env,
+                           capture_output=True, text=True, check=True)
+    return hasil.stdout.strip().splitlines()[-1]
+
+
+def bench_startup(ulang=5):
+    # cold  : cache belum ada (dibangun sekali lalu ditulis)
+    # warm  : cache valid, tabel dan permukaan fuzzy dibuka dengan mmap
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, STUNTING_CACHE_DIR=os.path.join(tmp, 'cache'),
+                   STUNTING_DB_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", STUNTING_STORAGE='sqlite',
+                   STUNTING_DIR_ANTRIAN=os.path.join(tmp, 'antrian'))
+        hasil = {}
+        for nama, kode in SKRIP_STARTUP.items():
+            cold = []
+            for _ in range(ulang):
+                shutil.rmtree(env['STUNTING_CACHE_DIR'], ignore_errors=True)
+                cold.append(_jalankan(kode, env))
+            warm = [_jalankan(kode, env) for _ in range(ulang)]
+            hasil[nama] = {'cold': statistics.median(cold), 'warm': statistics.median(warm)}
+        hasil['modul_berat_warm'] = _modul_berat(env)
+        return hasil
+
+
+def tampilkan_startup(hasil):
+    print(f"{'Startup (median)':<20}{'cold':>10}{'warm':>10}")
+    for nama in SKRIP_STARTUP:
+        print(f"{nama:<20}{hasil[nama]['cold']:>9.3f}s{hasil[nama]['warm']:>9.3f}s")
+    print(f"Modul berat yang termuat saat warm start: {hasil['modul_berat_warm']}")
+
+
+def _ukur(fungsi, jumlah, ulang):
+    # Median dari beberapa pengulangan; jumlah = banyak anak per pengulangan.
+    waktu = []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        fungsi()
+        waktu.append(time.perf_counter() - mulai)
+    return jumlah, statistics.median(waktu)
+
+
+def bench_lms(ai, populasi, ulang):
+    data = list(populasi[['gender', 'umur', 'tinggi', 'berat']].itertuples(index=False, name=None))
+    gender, umur = populasi['gender'].to_numpy(), populasi['umur'].to_numpy(dtype=float)
+    tinggi, berat = populasi['tinggi'].to_numpy(dtype=float), populasi['berat'].to_numpy(dtype=float)
+    referensi = ai.model.referensi
+
+    def per_anak():
+        for g, u, t, b in data:
+            ai.hitung_z_tb_u(g, u, t)
+            ai.hitung_z_bb_u(g, u, b)
+
+    def batch():
+        referensi.z_score('lhfa', gender, umur, tinggi)
+        referensi.z_score('wfa', gender, umur, berat)
+
+    return {'lms per anak (hitung_z_tb_u + hitung_z_bb_u)': _ukur(per_anak, len(data), ulang),
+            'lms batch (WHOReference.z_score)': _ukur(batch, len(data), ulang)}
+
+
+def bench_fuzzy(ai, populasi, ulang):
+    from fuzzy_engine import buat_engine
+
+    gender, umur = populasi['gender'].to_numpy(), populasi['umur'].to_numpy(dtype=float)
+    z_tb = np.nan_to_num(ai.model.referensi.z_score('lhfa', gender, umur, populasi['tinggi'].to_numpy(dtype=float)))
+    z_bb = np.nan_to_num(ai.model.referensi.z_score('wfa', gender, umur, populasi['berat'].to_numpy(dtype=float)))
+    hasil = {}
+    for mode in ('exact', 'compiled'):
+        engine = ai.model.engine if ai.model.engine.mode == mode else buat_engine(mode)
+        # Engine exact (skfuzzy compute()) lambat; cukup sebagian populasi.
+        n = min(len(z_tb), 500) if mode == 'exact' else len(z_tb)
+        hasil[f'fuzzy {mode} per anak'] = _ukur(
+            lambda: [engine.skor(a, b) for a, b in zip(z_tb[:n], z_bb[:n])], n, ulang)
+        hasil[f'fuzzy {mode} batch'] = _ukur(lambda: engine.skor_batch(z_tb[:n], z_bb[:n]), n, ulang)
+    return hasil
+
+
+def bench_simpan(ai, populasi, ulang):
+    from batch import skrining_batch
+
+    hasil = skrining_batch(ai, populasi)
+    records = hasil.to_dict(orient='records')
+    # Tanggal lain agar simpan_banyak tidak hanya melewati duplikat.
+    records_banyak = hasil.assign(Tanggal='2000-01-01 00:00').to_dict(orient='records')
+
+    def per_anak():
+        # Dengan antrian write-behind simpan_data hanya menulis jurnal;
+        # antrian dikuras di dalam waktu yang diukur.
+        for record in records:
+            ai.simpan_data(record)
+        if ai.antrian is not None:
+            ai.antrian.kuras()
+
+    return {'simpan_data per anak (sampai tersimpan)': _ukur(per_anak, len(records), 1),
+            'simpan_banyak': _ukur(lambda: ai.storage.simpan_banyak(records_banyak), len(records), 1)}
+
+
+def bench_http(app, populasi, ulang):
+    klien = app.test_client()
+    form = [{'nama': r.nama, 'gender': r.gender, 'tipe_umur': 'bulan', 'umur': str(r.umur),
+             'tinggi': str(r.tinggi), 'berat': str(r.berat)}
+            for r in populasi.head(min(len(populasi), 1000)).itertuples()]
+
+    def post_index():
+        for data in form:
+            assert klien.post('/', data=data).status_code == 200
+
+    def get_database(**param):
+        def jalan():
+            for _ in range(20):
+                assert klien.get('/database', query_string=param).status_code == 200
+        return jalan
+
+    return {'POST /': _ukur(post_index, len(form), 1),
+            'GET /database': _ukur(get_database(), 20, ulang),
+            'GET /database (filter)': _ukur(get_database(kesimpulan='Stunted (Stunting)', jk='perempuan',
+                                                         umur='12-23'), 20, ulang)}
+
+
+def jalankan_benchmark(tahap, jumlah, ulang, seed=0):
+    hasil = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if set(tahap) - {'startup'}:
+            # app membuat StuntingAI saat diimpor; arahkan penyimpanannya ke
+            # database sementara agar laporan asli tidak tersentuh.
+            os.environ['STUNTING_STORAGE'] = 'sqlite'
+            os.environ['STUNTING_DB_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            os.environ['STUNTING_DIR_ANTRIAN'] = os.path.join(tmp, 'antrian')
+            import app
+            from batch import populasi_sintetis
+
+            ai = app.ai_system
+            populasi = populasi_sintetis(jumlah, ai.model.referensi, seed=seed)
+            for nama, fungsi in (('lms', bench_lms), ('fuzzy', bench_fuzzy), ('simpan', bench_simpan)):
+                if nama in tahap:
+                    hasil.update(fungsi(ai, populasi, ulang))
+            if 'http' in tahap:
+                hasil.update(bench_http(app.app, populasi, ulang))
+            if ai.antrian is not None:
+                ai.antrian.tutup()
+            ai.storage.engine.dispose()
+
+    print(f"\n{'Tahap':<48}{'N':>7}{'total':>10}{'per anak':>12}{'anak/detik':>13}")
+    for nama, (n, detik) in hasil.items():
+        print(f"{nama:<48}{n:>7}{detik:>9.3f}s{detik / n * 1e6:>10.1f}µs{n / detik:>13.0f}")
+    if 'startup' in tahap:
+        print()
+        tampilkan_startup(bench_startup(ulang))
+    return hasil
+
+
+def populasi_golden(referensi, seed=0):
+    # Semua umur 0-60 bulan x kedua jenis kelamin x kisi z-score (termasuk di
+    # luar +-5 SD dan kasus gizi lebih), ditambah populasi acak umur pecahan,
+    # kisi rapat di tepi keanggotaan fuzzy (z +-1,8..2,2, tempat permukaan
+    # terkompilasi paling menyimpang) dan titik yang skornya dekat batas kelas.
+    import pandas as pd
+    from batch import populasi_sintetis
+    from fuzzy_engine import BATAS_KLASIFIKASI, MamdaniEvaluator
+    from aturan_fuzzy import baca_aturan
+
+    umur, gender, z_tb, z_bb = (a.ravel() for a in np.meshgrid(
+        np.arange(61), ['laki-laki', 'perempuan'], [-5.5, -3.5, -2.5, -1.5, 0.0, 2.5],
+        [-3.5, -2.5, -1.0, 0.5, 2.5, 5.5], indexing='ij'))
+    umur = umur.astype(float)
+
+    def ukuran(indikator, gender, umur, z, desimal=1):
+        L, M, S = np.moveaxis(referensi.nilai(indikator, gender, umur), -1, 0)
+        return np.round(M * (1 + L * S * z) ** (1 / L), desimal)
+
+    kisi = pd.DataFrame({'gender': gender, 'umur': umur, 'tinggi': ukuran('lhfa', gender, umur, z_tb),
+                         'berat': ukuran('wfa', gender, umur, z_bb)})
+    acak = populasi_sintetis(2000, referensi, seed=seed)[['gender', 'umur', 'tinggi', 'berat']]
+
+    rng = np.random.default_rng(seed)
+    tepi = np.concatenate([np.arange(-2.2, -1.79, 0.02), np.arange(1.8, 2.21, 0.02)])
+    lebar = [-3.5, -2.5, -1.0, 0.5, 2.5]
+    z_tb, z_bb = (a.ravel() for a in np.meshgrid(tepi, tepi, indexing='ij'))
+    z_tb = np.concatenate([z_tb, np.repeat(tepi, len(lebar)), np.tile(lebar, len(tepi))])
+    z_bb = np.concatenate([z_bb, np.tile(lebar, len(tepi)), np.repeat(tepi, len(lebar))])
+
+    evaluator = MamdaniEvaluator.dari_konfigurasi(baca_aturan())
+    calon = rng.uniform(-3.5, 3.0, size=(60000, 2))
+    skor = evaluator.skor(stunting_score=calon[:, 0], gizi_score=calon[:, 1])
+    dekat = np.min([np.abs(skor - b) for b in BATAS_KLASIFIKASI], axis=0) < 1.0
+    z_tb = np.concatenate([z_tb, calon[dekat, 0]])
+    z_bb = np.concatenate([z_bb, calon[dekat, 1]])
+
+    # Tiga desimal agar z hasil pembulatan ukuran tetap di sekitar target.
+    gender = rng.choice(['laki-laki', 'perempuan'], len(z_tb))
+    umur = np.round(rng.uniform(0, 60, len(z_tb)), 1)
+    rapat = pd.DataFrame({'gender': gender, 'umur': umur, 'tinggi': ukuran('lhfa', gender, umur, z_tb, 3),
+                          'berat': ukuran('wfa', gender, umur, z_bb, 3)})
+    return pd.concat([kisi, acak, rapat], ignore_index=True)
+
+
+def tulis_golden(path=PATH_GOLDEN):
+    from inferensi import ModelStunting
+
+    model = ModelStunting.muat('exact')
+    golden = populasi_golden(model.referensi)
+    hasil = [model.inferensi(*baris) for baris in golden.itertuples(index=False, name=None)]
+    golden['z_tb'] = [h.z_tb for h in hasil]
+    golden['z_bb'] = [h.z_bb for h in hasil]
+    golden['skor'] = [h.skor for h in hasil]
+    golden['kesimpulan'] = [h.kesimpulan for h in hasil]
+    golden.to_csv(path, index=False)
+    print(f"{len(golden)} baris golden output ditulis ke {path}")
+
+
+def cek_regresi(mode, path=PATH_GOLDEN, toleransi=None):
+    # Membandingkan jalur per anak (inferensi) dan jalur batch
+    # (inferensi_batch) dengan golden output. Mengembalikan jumlah pelanggaran.
+    import pandas as pd
+    from inferensi import ModelStunting
+
+    golden = pd.read_csv(path)
+    model = ModelStunting.muat(mode)
+    toleransi = TOLERANSI_SKOR[mode] if toleransi is None else toleransi
+    data = list(golden[['gender', 'umur', 'tinggi', 'berat']].itertuples(index=False, name=None))
+    per_anak = [model.inferensi(*baris) for baris in data]
+    batch = model.inferensi_batch(*(golden[k].to_numpy() for k in ('gender', 'umur', 'tinggi', 'berat')))
+    jalur = {
+        'per anak': ([h.z_tb for h in per_anak], [h.z_bb for h in per_anak],
+                     [h.skor for h in per_anak], [h.kesimpulan for h in per_anak]),
+        'batch': (batch['z_tb'], batch['z_bb'], batch['skor'], batch['kesimpulan']),
+    }
+
+    skor_golden = golden['skor'].to_numpy()
+    print(f"Golden output: {len(golden)} anak, engine {mode}, toleransi skor {toleransi}")
+    pelanggaran = 0
+    for nama, (z_tb, z_bb, skor, kesimpulan) in jalur.items():
+        galat_z = max(np.max(np.abs(np.asarray(z_tb) - golden['z_tb'])),
+                      np.max(np.abs(np.asarray(z_bb) - golden['z_bb'])))
+        galat_skor = np.abs(np.asarray(skor, dtype=float) - skor_golden)
+        beda = np.asarray(kesimpulan) != golden['kesimpulan'].to_numpy()
+        salah = int((galat_z > TOLERANSI_Z) * len(golden) + np.sum(galat_skor > toleransi) + np.sum(beda))
+        pelanggaran += salah
+        print(f"  {nama:<9} galat z maks {galat_z:.2e}, galat skor maks {galat_skor.max():.4f}, "
+              f"Kesimpulan berbeda {int(beda.sum())}, pelanggaran {salah}")
+    return pelanggaran
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dan uji regresi Sistem Deteksi Stunting")
+    parser.add_argument('--tahap', nargs='+', choices=TAHAP, default=TAHAP)
+    parser.add_argument('--jumlah', type=int, default=2000, help="Ukuran populasi sintetis")
+    parser.add_argument('--ulang', type=int, default=5, help="Jumlah pengulangan per pengukuran")
+    parser.add_argument('--seed', type=int, default=0)
+    sub = parser.add_subparsers(dest='perintah')
+
+    p_regresi = sub.add_parser('regresi', help="Bandingkan keluaran engine dengan golden output")
+    p_regresi.add_argument('--engine', nargs='+', choices=list(TOLERANSI_SKOR), default=['compiled'])
+    p_regresi.add_argument('--toleransi', type=float, default=None, help="Ganti toleransi skor bawaan engine")
+    p_regresi.add_argument('--tulis', action='store_true', help="Tulis ulang golden output dengan engine exact")
+
+    args = parser.parse_args()
+    if args.perintah == 'regresi':
+        if args.tulis:
+            tulis_golden()
+            return
+        pelanggaran = sum(cek_regresi(mode, toleransi=args.toleransi) for mode in args.engine)
+        print("LULUS" if not pelanggaran else f"GAGAL: {pelanggaran} pelanggaran")
+        sys.exit(1 if pelanggaran else 0)
+    jalankan_benchmark(args.tahap, args.jumlah, args.ulang, args.seed)
+
+
+if __name__ == "__main__":
+    main()
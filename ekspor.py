@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+import os
+from storage import KOLOM
+
+# Ekspor riwayat pemeriksaan secara streaming: storage dibaca per blok dan
+# setiap blok langsung diubah menjadi bytes, sehingga memori tetap sebesar
+# satu blok berapa pun panjang riwayatnya.
+KOLOM_EKSPOR = list(KOLOM)
+KOLOM_ANGKA = {'Umur_Bulan', 'Tinggi_cm', 'Berat_kg', 'Z_Score_TB', 'Z_Score_BB', 'Skor_Fuzzy'}
+
+MIMETYPE = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+EKSTENSI = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.parquet': 'parquet'}
+
+
+def format_dari_path(path, format=None):
+    if format:
+        return format
+    ekstensi = os.path.splitext(path)[1].lower()
+    if ekstensi not in EKSTENSI:
+        raise ValueError(f"Format file {path} tidak dikenal; gunakan salah satu dari: {', '.join(MIMETYPE)}")
+    return EKSTENSI[ekstensi]
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Format Parquet membutuhkan paket pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+def _csv(daftar_blok):
+    buffer = io.StringIO()
+    penulis = csv.DictWriter(buffer, KOLOM_EKSPOR, extrasaction='ignore')
+    penulis.writeheader()
+    for blok in daftar_blok:
+        penulis.writerows(blok)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson(daftar_blok):
+    for blok in daftar_blok:
+        yield ''.join(json.dumps({k: r.get(k) for k in KOLOM_EKSPOR}, ensure_ascii=False) + '\n'
+                      for r in blok).encode('utf-8')
+
+
+class _Penampung(io.RawIOBase):
+    # Sink tulis-saja untuk ParquetWriter; isinya diambil setelah tiap row
+    # group sehingga file dapat dialirkan tanpa ditampung utuh.
+    def __init__(self):
+        self._data = bytearray()
+        self._posisi = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._data += data
+        self._posisi += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posisi
+
+    def ambil(self):
+        data = bytes(self._data)
+        self._data.clear()
+        return data
+
+
+def skema_parquet():
+    pa, _ = _pyarrow()
+    return pa.schema([(k, pa.float64() if k in KOLOM_ANGKA else pa.string()) for k in KOLOM_EKSPOR])
+
+
+def _parquet(daftar_blok):
+    pa, pq = _pyarrow()
+    skema = skema_parquet()
+    sink = _Penampung()
+    penulis = pq.ParquetWriter(sink, skema, compression='zstd')
+    try:
+        for blok in daftar_blok:
+            penulis.write_table(pa.Table.from_pylist([{k: r.get(k) for k in KOLOM_EKSPOR} for r in blok],
+                                                     schema=skema))
+            yield sink.ambil()
+    finally:
+        penulis.close()
+    yield sink.ambil()
+
+
+PENULIS = {'csv': _csv, 'ndjson': _ndjson, 'parquet': _parquet}
+
+
+def aliran_ekspor(storage, format='csv', ukuran_blok=5000, dari=None, sampai=None, kesimpulan=None):
+    if format not in PENULIS:
+        raise ValueError(f"Format ekspor tidak dikenal: {format}")
+    if format == 'parquet':
+        _pyarrow()
+    return PENULIS[format](storage.iter_blok(ukuran_blok, dari=dari, sampai=sampai, kesimpulan=kesimpulan))
+
+
+def ekspor_ke_file(storage, path, format=None, ukuran_blok=5000, **filter):
+    format = format_dari_path(path, format)
+    jumlah = 0
+
+    def hitung(daftar_blok):
+        nonlocal jumlah
+        for blok in daftar_blok:
+            jumlah += len(blok)
+            yield blok
+
+    sementara = f'{path}.tmp'
+    with open(sementara, 'wb') as f:
+        for data in PENULIS[format](hitung(storage.iter_blok(ukuran_blok, **filter))):
+            f.write(data)
+    os.replace(sementara, path)
+    return jumlah
@@ -0,0 +1,339 @@
+import sys
+import threading
+import numpy as np
+from aturan_fuzzy import baca_aturan, keanggotaan, universe
+
+BATAS_Z = 5.0
+RESOLUSI_DEFAULT = 0.05
+# Batas skor antar kelas (inferensi.klasifikasi).
+BATAS_KLASIFIKASI = (45, 75)
+# Galat interpolasi tiap sel diukur pada SUB_SEL x SUB_SEL titik terhadap
+# evaluasi exact. Titik di sel dengan galat > BATAS_GALAT_SEL, atau yang
+# skornya dalam 2 x galat sel (+ MARGIN_KELAS) dari batas kelas, dihitung
+# exact sehingga kesimpulannya sama dengan skfuzzy.
+SUB_SEL = 4
+BATAS_GALAT_SEL = 0.5
+MARGIN_KELAS = 0.1
+# Luas di bawah ini (tetapi > 0) hanya sisa pembulatan keanggotaan skfuzzy;
+# centroidnya tidak bisa diinterpolasi, jadi selnya selalu dihitung exact.
+LUAS_RAGU = 1e-6
+# Batas jumlah titik sebelum evaluator mendeduplikasi tingkat potong.
+MIN_TITIK_UNIK = 256
+
+
+def set_up_fuzzy_system(konfig=None):
+    # skfuzzy diimpor di sini saja: engine terkompilasi tidak membutuhkannya.
+    import skfuzzy as fuzz
+    from skfuzzy import control as ctrl
+
+    konfig = konfig or baca_aturan()
+    variabel = {}
+    for nama, spek in konfig['input'].items():
+        variabel[nama] = ctrl.Antecedent(universe(spek), nama)
+    nama_output, spek_output = konfig['output']
+    output = ctrl.Consequent(universe(spek_output), nama_output)
+    for var, spek in list(zip(variabel.values(), konfig['input'].values())) + [(output, spek_output)]:
+        for term, (fungsi, parameter) in spek['term'].items():
+            var[term] = getattr(fuzz, fungsi)(var.universe, parameter)
+
+    def antecedent(node):
+        if node[0] == 'term':
+            return variabel[node[1]][node[2]]
+        if node[0] == 'not':
+            return ~antecedent(node[1])
+        a, b = antecedent(node[1]), antecedent(node[2])
+        return a & b if node[0] == 'and' else a | b
+
+    rules = []
+    for pohon, term, bobot in konfig['aturan']:
+        rules.append(ctrl.Rule(antecedent(pohon), output[term] if bobot == 1 else output[term] % bobot))
+    return ctrl.ControlSystem(rules)
+
+
+def _klip(z):
+    return max(min(z, BATAS_Z), -BATAS_Z)
+
+
+def _grid(resolusi):
+    return np.linspace(-BATAS_Z, BATAS_Z, int(round(2 * BATAS_Z / resolusi)) + 1)
+
+
+def _bagi_centroid(momen, luas):
+    # Sama seperti skfuzzy: luas nol berarti tidak ada rule aktif (skor 0),
+    # penyebut dibatasi bawah oleh epsilon mesin.
+    return np.where(luas > 0, momen / np.fmax(luas, np.finfo(float).eps), 0.0)
+
+
+class MamdaniEvaluator:
+    # Evaluasi Mamdani (AND=min, OR=max, implikasi=clip, agregasi=max) untuk
+    # array input sekaligus. Defuzzifikasi centroid mengikuti cara skfuzzy:
+    # universe output ditambah titik potong tiap term, lalu dihitung luas
+    # trapesium per segmen.
+    def __init__(self, inputs, output, rules):
+        self.inputs = inputs
+        self.output_universe, self.output_terms = output
+        self.rules = rules
+
+    @classmethod
+    def dari_konfigurasi(cls, konfig):
+        inputs = {nama: (universe(spek), keanggotaan(spek)) for nama, spek in konfig['input'].items()}
+        spek_output = konfig['output'][1]
+        return cls(inputs, (universe(spek_output), keanggotaan(spek_output)), list(konfig['aturan']))
+
+    @classmethod
+    def dari_control_system(cls, sistem):
+        from skfuzzy.control.term import TermAggregate
+
+        inputs = {}
+        for var in sistem.antecedents:
+            inputs[var.label] = (var.universe, {t: term.mf for t, term in var.terms.items()})
+        konsekuen = list(sistem.consequents)[0]
+        output = (konsekuen.universe, {t: term.mf for t, term in konsekuen.terms.items()})
+
+        def pohon(node):
+            if isinstance(node, TermAggregate):
+                if node.kind == 'not':
+                    return ('not', pohon(node.term1))
+                return (node.kind, pohon(node.term1), pohon(node.term2))
+            return ('term', node.parent.label, node.label)
+
+        rules = []
+        for rule in sistem.rules:
+            for wt in rule.consequent:
+                rules.append((pohon(rule.antecedent), wt.term.label, wt.weight))
+        return cls(inputs, output, rules)
+
+    def _derajat(self, node, nilai):
+        jenis = node[0]
+        if jenis == 'term':
+            universe, terms = self.inputs[node[1]]
+            return np.interp(nilai[node[1]], universe, terms[node[2]], left=0.0, right=0.0)
+        if jenis == 'not':
+            return 1.0 - self._derajat(node[1], nilai)
+        a = self._derajat(node[1], nilai)
+        b = self._derajat(node[2], nilai)
+        return np.fmin(a, b) if jenis == 'and' else np.fmax(a, b)
+
+    def aktivasi(self, **nilai):
+        nilai = {k: np.atleast_1d(np.asarray(v, dtype=float)) for k, v in nilai.items()}
+        n = len(next(iter(nilai.values())))
+        potong = {t: np.zeros(n) for t in self.output_terms}
+        for antecedent, term, bobot in self.rules:
+            potong[term] = np.fmax(potong[term], self._derajat(antecedent, nilai) * bobot)
+        return potong
+
+    def momen_luas(self, ukuran_blok=4096, **nilai):
+        # Momen dan luas hanya bergantung pada tingkat potong tiap term. Di
+        # kisi rapat banyak titik berbagi tingkat yang sama, jadi
+        # defuzzifikasi (bagian mahal) dihitung sekali per kombinasi unik.
+        # Untuk beberapa titik saja np.unique lebih mahal daripada hematnya.
+        potong = self.aktivasi(**nilai)
+        terms = list(potong)
+        tingkat = np.stack([potong[t] for t in terms], axis=1)
+        indeks = None
+        if len(tingkat) > MIN_TITIK_UNIK:
+            tingkat, indeks = np.unique(tingkat, axis=0, return_inverse=True)
+        n = len(tingkat)
+        momen = np.empty(n)
+        luas = np.empty(n)
+        for awal in range(0, n, ukuran_blok):
+            blok = {t: tingkat[awal:awal + ukuran_blok, k] for k, t in enumerate(terms)}
+            momen[awal:awal + ukuran_blok], luas[awal:awal + ukuran_blok] = self._centroid_blok(blok)
+        if indeks is None:
+            return momen, luas
+        indeks = indeks.reshape(-1)
+        return momen[indeks], luas[indeks]
+
+    def _centroid_blok(self, potong):
+        x = self.output_universe.astype(float)
+        x1, x2 = x[:-1], x[1:]
+        lebar = x2 - x1
+        n = len(next(iter(potong.values())))
+
+        # Titik simpul per segmen: kedua ujung + titik potong tiap term.
+        simpul = [np.broadcast_to(x1, (n, len(x1))), np.broadcast_to(x2, (n, len(x1)))]
+        for term, mf in self.output_terms.items():
+            c = potong[term][:, None]
+            y1, y2 = mf[:-1], mf[1:]
+            dy = np.where(y2 != y1, y2 - y1, 1.0)
+            t = x1 + (c - y1) * lebar / dy
+            didalam = (y1 != y2) & (t > x1) & (t < x2)
+            simpul.append(np.where(didalam, t, x1))
+        simpul = np.sort(np.stack(simpul, axis=-1), axis=-1)
+
+        f = np.zeros_like(simpul)
+        for term, mf in self.output_terms.items():
+            c = potong[term][:, None, None]
+            f = np.maximum(f, np.minimum(c, np.interp(simpul, x, mf)))
+
+        a, b = simpul[..., :-1], simpul[..., 1:]
+        fa, fb = f[..., :-1], f[..., 1:]
+        d = b - a
+        luas = (d * (fa + fb) / 2.0).sum(axis=(1, 2))
+        momen = (d * (a * (2 * fa + fb) + b * (fa + 2 * fb)) / 6.0).sum(axis=(1, 2))
+        return momen, luas
+
+    def skor(self, **nilai):
+        return _bagi_centroid(*self.momen_luas(**nilai))
+
+
+class FuzzyEngineExact:
+    mode = 'exact'
+
+    def __init__(self, konfig=None):
+        self.konfig = konfig or baca_aturan()
+        self._lokal = threading.local()
+
+    @property
+    def simulasi(self):
+        # skfuzzy menyimpan input dan derajat keanggotaan di objek Antecedent/
+        # Term milik ControlSystem, bukan di simulasinya. Tiap thread karena
+        # itu membangun ControlSystem sendiri.
+        if not hasattr(self._lokal, 'simulasi'):
+            from skfuzzy import control as ctrl
+            self._lokal.simulasi = ctrl.ControlSystemSimulation(set_up_fuzzy_system(self.konfig), cache=False)
+        return self._lokal.simulasi
+
+    def skor(self, z_tb, z_bb):
+        simulasi = self.simulasi
+        simulasi.input['stunting_score'] = _klip(z_tb)
+        simulasi.input['gizi_score']     = _klip(z_bb)
+        try:
+            simulasi.compute()
+            return float(simulasi.output[self.konfig['output'][0]])
+        except Exception:
+            return 0.0
+
+    def skor_batch(self, z_tb, z_bb):
+        z_tb = np.asarray(z_tb, dtype=float)
+        z_bb = np.asarray(z_bb, dtype=float)
+        return np.array([self.skor(a, b) for a, b in zip(z_tb.ravel(), z_bb.ravel())]).reshape(z_tb.shape)
+
+
+class FuzzyEngineCompiled:
+    mode = 'compiled'
+
+    def __init__(self, konfig=None, resolusi=RESOLUSI_DEFAULT):
+        self.konfig = konfig or baca_aturan()
+        self.resolusi = resolusi
+        self.evaluator = MamdaniEvaluator.dari_konfigurasi(self.konfig)
+        self.grid = _grid(resolusi)
+        self._bangun_permukaan()
+
+    @classmethod
+    def dari_permukaan(cls, resolusi, permukaan_momen, permukaan_luas, galat_sel, konfig):
+        # Dipakai saat memuat dari cache: tanpa evaluasi rule. Evaluator
+        # (tanpa skfuzzy) tetap dibuat untuk titik yang dihitung exact.
+        engine = cls.__new__(cls)
+        engine.konfig = konfig
+        engine.resolusi = resolusi
+        engine.evaluator = MamdaniEvaluator.dari_konfigurasi(konfig)
+        engine.grid = _grid(resolusi)
+        engine.permukaan_momen = permukaan_momen
+        engine.permukaan_luas = permukaan_luas
+        engine.galat_sel = galat_sel
+        return engine
+
+    def _interval_berubah(self, nama):
+        # Interval grid tempat derajat keanggotaan input tidak konstan. Di
+        # interval lain seluruh rule konstan, jadi interpolasinya tepat.
+        universe, terms = self.evaluator.inputs[nama]
+        titik = np.union1d(self.grid, universe[(universe > -BATAS_Z) & (universe < BATAS_Z)])
+        simpul = np.searchsorted(titik, self.grid)
+        berubah = np.zeros(len(self.grid) - 1, dtype=bool)
+        for mf in terms.values():
+            d = np.interp(titik, universe, mf, left=0.0, right=0.0)
+            atas = np.maximum(np.maximum.reduceat(d, simpul[:-1]), d[simpul[1:]])
+            bawah = np.minimum(np.minimum.reduceat(d, simpul[:-1]), d[simpul[1:]])
+            berubah |= atas > bawah
+        return berubah
+
+    def _sumbu_uji(self, nama, posisi):
+        # Simpul grid ditambah titik pada posisi relatif (0..1) di dalam
+        # interval yang berubah.
+        berubah = self._interval_berubah(nama)
+        sisip = (self.grid[:-1][berubah, None] + self.resolusi * np.asarray(posisi)).ravel()
+        return np.union1d(self.grid, sisip)
+
+    def _bangun_permukaan(self):
+        # Momen dan luas diinterpolasi terpisah: keduanya kontinu, sedangkan
+        # centroidnya melompat ke 0 di daerah tanpa rule aktif. Evaluasi
+        # dilakukan sekali pada kisi uji; simpul grid menjadi permukaan dan
+        # titik sisipan mengukur galat tiap sel.
+        tb = self._sumbu_uji('stunting_score', np.arange(1, SUB_SEL) / SUB_SEL)
+        bb = self._sumbu_uji('gizi_score', np.arange(1, SUB_SEL) / SUB_SEL)
+        kisi_tb, kisi_bb = np.meshgrid(tb, bb, indexing='ij')
+        momen, luas = self.evaluator.momen_luas(stunting_score=kisi_tb.ravel(), gizi_score=kisi_bb.ravel())
+        momen, luas = momen.reshape(kisi_tb.shape), luas.reshape(kisi_tb.shape)
+
+        simpul_tb, simpul_bb = np.searchsorted(tb, self.grid), np.searchsorted(bb, self.grid)
+        self.permukaan_momen = momen[np.ix_(simpul_tb, simpul_bb)]
+        self.permukaan_luas = luas[np.ix_(simpul_tb, simpul_bb)]
+
+        galat = np.abs(self._skor_permukaan(kisi_tb, kisi_bb)[0] - _bagi_centroid(momen, luas))
+        # Maksimum per sel tertutup: titik di tepi sel ikut kedua sel.
+        galat = np.stack([galat[a:b + 1].max(axis=0) for a, b in zip(simpul_tb[:-1], simpul_tb[1:])])
+        galat = np.stack([galat[:, a:b + 1].max(axis=1) for a, b in zip(simpul_bb[:-1], simpul_bb[1:])], axis=1)
+        luas = self.permukaan_luas
+        ragu = (luas > 0) & (luas < LUAS_RAGU)
+        ragu = ragu[:-1, :-1] | ragu[1:, :-1] | ragu[:-1, 1:] | ragu[1:, 1:]
+        self.galat_sel = np.where(ragu, np.inf, galat)
+
+    def _skor_permukaan(self, z_tb, z_bb):
+        n = len(self.grid) - 1
+        fi = (z_tb + BATAS_Z) / self.resolusi
+        fj = (z_bb + BATAS_Z) / self.resolusi
+        i = np.clip(np.floor(fi).astype(int), 0, n - 1)
+        j = np.clip(np.floor(fj).astype(int), 0, n - 1)
+        u = fi - i
+        v = fj - j
+
+        def bilinear(p):
+            return ((1 - u) * (1 - v) * p[i, j] + u * (1 - v) * p[i + 1, j]
+                    + (1 - u) * v * p[i, j + 1] + u * v * p[i + 1, j + 1])
+
+        return _bagi_centroid(bilinear(self.permukaan_momen), bilinear(self.permukaan_luas)), i, j
+
+    def skor_batch(self, z_tb, z_bb):
+        bentuk = np.shape(z_tb)
+        z_tb = np.clip(np.asarray(z_tb, dtype=float), -BATAS_Z, BATAS_Z).ravel()
+        z_bb = np.clip(np.asarray(z_bb, dtype=float), -BATAS_Z, BATAS_Z).ravel()
+        skor, i, j = self._skor_permukaan(z_tb, z_bb)
+        galat = self.galat_sel[i, j]
+        jarak = np.min([np.abs(skor - b) for b in BATAS_KLASIFIKASI], axis=0)
+        exact = (galat > BATAS_GALAT_SEL) | (jarak <= 2 * galat + MARGIN_KELAS)
+        if exact.any():
+            skor[exact] = self.evaluator.skor(stunting_score=z_tb[exact], gizi_score=z_bb[exact])
+        return skor.reshape(bentuk)
+
+    def skor(self, z_tb, z_bb):
+        return float(self.skor_batch(z_tb, z_bb))
+
+    def galat_maksimum(self, kepadatan=SUB_SEL):
+        # Galat skor_batch terhadap evaluasi exact (identik dengan skfuzzy)
+        # pada kisi rapat: kepadatan titik per sel per sumbu, di tengah di
+        # antara titik kalibrasi, di semua sel yang keanggotaannya berubah.
+        tb = self._sumbu_uji('stunting_score', (np.arange(kepadatan) + 0.5) / kepadatan)
+        bb = self._sumbu_uji('gizi_score', (np.arange(kepadatan) + 0.5) / kepadatan)
+        kisi_tb, kisi_bb = (a.ravel() for a in np.meshgrid(tb, bb, indexing='ij'))
+        acuan = self.evaluator.skor(stunting_score=kisi_tb, gizi_score=kisi_bb)
+        galat = np.abs(self.skor_batch(kisi_tb, kisi_bb) - acuan)
+        k = int(np.argmax(galat))
+        return float(galat[k]), (float(kisi_tb[k]), float(kisi_bb[k]))
+
+
+def buat_engine(mode='compiled', resolusi=RESOLUSI_DEFAULT, konfig=None):
+    if mode == 'exact':
+        return FuzzyEngineExact(konfig)
+    if mode == 'compiled':
+        return FuzzyEngineCompiled(konfig, resolusi=resolusi)
+    raise ValueError(f"Mode engine tidak dikenal: {mode}")
+
+
+if __name__ == "__main__":
+    daftar_resolusi = [float(r) for r in sys.argv[1:]] or [0.1, RESOLUSI_DEFAULT]
+    for resolusi in daftar_resolusi:
+        engine = FuzzyEngineCompiled(resolusi=resolusi)
+        galat, titik = engine.galat_maksimum()
+        print(f"Resolusi {resolusi:<6} grid {len(engine.grid)}x{len(engine.grid)} "
+              f"galat maks {galat:.4f} di (TB={titik[0]:.3f}, BB={titik[1]:.3f})")
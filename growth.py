@@ -0,0 +1,61 @@
+BATAS_PENURUNAN_Z = 0.5
+
+TINGKAT_KESIMPULAN = {
+    'Normal': 0,
+    'Stunted (Stunting)': 1,
+    'Severely Stunted (Stunting Berat)': 2,
+}
+
+
+def buat_id_anak(nama, gender, id_anak=None):
+    # Pakai nomor identitas (KIA/NIK) bila diisi; jika tidak, nama + jenis
+    # kelamin yang dinormalisasi.
+    if id_anak is not None and str(id_anak).strip():
+        return str(id_anak).strip()
+    return f"{' '.join(str(nama).lower().split())}|{str(gender).strip().lower()}"
+
+
+def _selisih(sekarang, sebelum):
+    if sekarang is None or sebelum is None:
+        return None
+    return sekarang - sebelum
+
+
+def perbarui_metrik(status, record):
+    # status: baris tabel anak sebelum kunjungan ini (None untuk kunjungan
+    # pertama). Mengembalikan baris baru tanpa membaca riwayat lengkap.
+    baru = {
+        'id_anak': record['id_anak'],
+        'nama': record['nama'],
+        'jk': record['jk'],
+        'jumlah_kunjungan': 1,
+        'tanggal_terakhir': record['tanggal'],
+        'umur_terakhir': record['umur_bulan'],
+        'z_tb_terakhir': record['z_score_tb'],
+        'z_bb_terakhir': record['z_score_bb'],
+        'kesimpulan_terakhir': record['kesimpulan'],
+        'selang_bulan': None,
+        'kecepatan_z_tb': None,
+        'kecepatan_z_bb': None,
+        'transisi': None,
+        'faltering': False,
+    }
+    if status is None:
+        return baru
+
+    baru['jumlah_kunjungan'] = status['jumlah_kunjungan'] + 1
+    selang = _selisih(record['umur_bulan'], status['umur_terakhir'])
+    delta_tb = _selisih(record['z_score_tb'], status['z_tb_terakhir'])
+    delta_bb = _selisih(record['z_score_bb'], status['z_bb_terakhir'])
+    baru['selang_bulan'] = selang
+    if selang:
+        baru['kecepatan_z_tb'] = delta_tb / selang if delta_tb is not None else None
+        baru['kecepatan_z_bb'] = delta_bb / selang if delta_bb is not None else None
+
+    sebelum = status['kesimpulan_terakhir']
+    if sebelum != record['kesimpulan']:
+        baru['transisi'] = f"{sebelum} → {record['kesimpulan']}"
+    memburuk = TINGKAT_KESIMPULAN.get(record['kesimpulan'], 0) > TINGKAT_KESIMPULAN.get(sebelum, 0)
+    turun = any(d is not None and d <= -BATAS_PENURUNAN_Z for d in (delta_tb, delta_bb))
+    baru['faltering'] = memburuk or turun
+    return baru
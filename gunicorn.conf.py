@@ -0,0 +1,38 @@
+# Deploy multi-proses: gunicorn -c gunicorn.conf.py app:app
+#
+# preload_app memuat app.py (tabel WHO + permukaan fuzzy) sekali di master;
+# worker hasil fork berbagi memori itu secara copy-on-write. Model hanya
+# dibaca setelah dimuat, jadi aman dipakai bersama oleh thread di tiap worker.
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('STUNTING_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('STUNTING_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('STUNTING_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Bekukan objek yang sudah ada agar siklus GC di worker tidak menyentuh
+    # (dan menyalin) halaman memori milik master.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Koneksi database tidak boleh dibagi antar proses.
+    from app import ai_system
+    if hasattr(ai_system.storage, 'engine'):
+        ai_system.storage.engine.dispose()
+    # Jurnal antrian worker yang mati dipulihkan sekarang, bukan saat
+    # pemeriksaan pertama masuk ke worker ini.
+    if ai_system.antrian is not None:
+        ai_system.antrian.mulai()
+
+
+def worker_exit(server, worker):
+    # Kuras antrian write-behind sebelum worker berhenti.
+    from app import ai_system
+    if ai_system.antrian is not None:
+        ai_system.antrian.tutup()
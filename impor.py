@@ -0,0 +1,119 @@
+import os
+import numpy as np
+from batch import skrining_batch
+from ekspor import format_dari_path, _pyarrow
+from storage import kunci_duplikat
+
+# Impor riwayat lama per blok. Z-score, skor fuzzy dan kesimpulan selalu
+# dihitung ulang (vektor per blok) dari umur, tinggi dan berat; nilai di file
+# sumber hanya dipakai untuk menghitung berapa kesimpulan yang berubah.
+# Pemeriksaan yang sudah tersimpan (anak, waktu dan ukuran sama) dilewati,
+# sehingga impor yang sama boleh dijalankan berulang kali. Deduplikasi hanya
+# memegang kunci satu blok di memori; blok sebelumnya sudah tersimpan dan
+# ditemukan lewat indeks id_anak. Karena itu impor membutuhkan SQLite, dan
+# pada mode uji (tidak ada yang disimpan) duplikat yang terpisah di blok
+# berbeda dalam file yang sama tidak terdeteksi.
+GENDER_VALID = ('laki-laki', 'perempuan')
+
+
+def baca_blok(path, format=None, ukuran_blok=5000, sep=','):
+    import pandas as pd
+
+    format = format_dari_path(path, format)
+    if format == 'csv':
+        yield from pd.read_csv(path, sep=sep, chunksize=ukuran_blok, dtype={'id_anak': str})
+    elif format == 'ndjson':
+        with pd.read_json(path, lines=True, chunksize=ukuran_blok, dtype=False, convert_dates=False) as pembaca:
+            yield from pembaca
+    elif format == 'parquet':
+        _, pq = _pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=ukuran_blok):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Format impor tidak dikenal: {format}")
+
+
+def _kolom(df, *nama):
+    for n in nama:
+        if n in df.columns:
+            return df[n]
+    return None
+
+
+def proses_blok(ai, df):
+    # Mengembalikan (DataFrame hasil valid, DataFrame ditolak + kolom alasan,
+    # jumlah kesimpulan yang berubah dibanding file sumber).
+    import pandas as pd
+
+    df = df.reset_index(drop=True)
+    masukan = df.copy()
+    if _kolom(df, 'umur', 'Umur_Bulan', 'umur_bulan') is None and 'Umur_Display' in df.columns:
+        masukan['Umur_Bulan'] = pd.to_numeric(
+            df['Umur_Display'].astype(str).str.extract(r'([\d.]+) Bulan', expand=False), errors='coerce')
+
+    tanggal = _kolom(df, 'Tanggal', 'Tanggal_Periksa', 'tanggal')
+    if tanggal is None:
+        raise ValueError("Kolom 'Tanggal' tidak ditemukan")
+    tanggal = tanggal.astype('string').str.strip()
+    hasil = skrining_batch(ai, masukan)
+
+    alasan = pd.Series('', index=df.index)
+    alasan[hasil['nama'].str.strip().isin(['', 'nan', 'None'])] += 'nama kosong; '
+    alasan[~hasil['JK'].isin(GENDER_VALID)] += 'jenis kelamin tidak dikenal; '
+    alasan[pd.to_datetime(tanggal, errors='coerce', format='mixed').isna()] += 'tanggal tidak valid; '
+    alasan[(hasil['Kesimpulan'] == 'Data tidak valid') & hasil['JK'].isin(GENDER_VALID)] += 'umur/tinggi/berat tidak valid; '
+    valid = (alasan == '').to_numpy()
+
+    hasil['Tanggal'] = tanggal
+    if 'uid' in df.columns:
+        hasil['uid'] = df['uid'].where(df['uid'].notna(), None)
+    if 'Umur_Display' in df.columns:
+        hasil['Umur_Display'] = df['Umur_Display'].where(df['Umur_Display'].notna(), hasil['Umur_Display'])
+
+    berubah = 0
+    kesimpulan_sumber = _kolom(df, 'Kesimpulan')
+    if kesimpulan_sumber is not None:
+        berubah = int(np.sum(valid & kesimpulan_sumber.notna().to_numpy()
+                             & (kesimpulan_sumber.to_numpy() != hasil['Kesimpulan'].to_numpy())))
+
+    ditolak = df[~valid].assign(alasan=alasan[~valid].str.rstrip('; '))
+    return hasil[valid], ditolak, berubah
+
+
+def impor_file(ai, path, format=None, ukuran_blok=5000, sep=',', path_ditolak=None, uji=False):
+    ringkasan = {'dibaca': 0, 'disimpan': 0, 'duplikat': 0, 'ditolak': 0, 'kesimpulan_berubah': 0}
+    if not hasattr(ai.storage, 'engine'):
+        raise ValueError("Impor membutuhkan penyimpanan SQLite; set STUNTING_STORAGE=sqlite lalu "
+                         "pindahkan data CSV dengan 'python main.py migrasi'")
+    header_ditolak = True
+    if path_ditolak and os.path.exists(path_ditolak):
+        os.remove(path_ditolak)
+    for df in baca_blok(path, format, ukuran_blok, sep):
+        ringkasan['dibaca'] += len(df)
+        hasil, ditolak, berubah = proses_blok(ai, df)
+        ringkasan['ditolak'] += len(ditolak)
+        ringkasan['kesimpulan_berubah'] += berubah
+        if path_ditolak and len(ditolak):
+            ditolak.to_csv(path_ditolak, mode='w' if header_ditolak else 'a', header=header_ditolak, index=False)
+            header_ditolak = False
+
+        kunci = [kunci_duplikat(*b) for b in hasil[['Tanggal', 'id_anak', 'Tinggi_cm', 'Berat_kg']]
+                 .itertuples(index=False, name=None)]
+        tersimpan = ai.storage.kunci_tersimpan({k[1] for k in kunci})
+        terlihat = set()
+        baru = []
+        for k, record in zip(kunci, hasil.to_dict(orient='records')):
+            if k in tersimpan or k in terlihat:
+                ringkasan['duplikat'] += 1
+                continue
+            terlihat.add(k)
+            baru.append(record)
+        if not uji:
+            ringkasan['disimpan'] += ai.storage.simpan_banyak(baru)
+        else:
+            ringkasan['disimpan'] += len(baru)
+    return ringkasan
+
+
+def nama_file_ditolak(path):
+    return os.path.splitext(path)[0] + '_ditolak.csv'
@@ -0,0 +1,294 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from fuzzy_engine import buat_engine, BATAS_KLASIFIKASI, RESOLUSI_DEFAULT
+from who_reference import WHOReference, kunci_gender
+from aturan_fuzzy import baca_aturan, PATH_ATURAN
+import model_cache
+import metrics
+from metrics import ukur
+
+
+@dataclass(frozen=True)
+class HasilInferensi:
+    z_tb: float
+    z_bb: float
+    skor: float
+    kesimpulan: str
+    warna: str
+
+
+def klasifikasi(skor):
+    if skor < BATAS_KLASIFIKASI[0]:
+        return 'Severely Stunted (Stunting Berat)', 'danger'
+    if skor < BATAS_KLASIFIKASI[1]:
+        return 'Stunted (Stunting)', 'warning'
+    return 'Normal', 'success'
+
+
+def klasifikasi_batch(skor):
+    bawah, atas = BATAS_KLASIFIKASI
+    kesimpulan = np.select([skor < bawah, skor < atas],
+                           ['Severely Stunted (Stunting Berat)', 'Stunted (Stunting)'], 'Normal')
+    warna = np.select([skor < bawah, skor < atas], ['danger', 'warning'], 'success')
+    return kesimpulan, warna
+
+
+# Saran tindak lanjut per kesimpulan untuk asesmen satu anak (form dan CLI).
+SARAN = {
+    'Severely Stunted (Stunting Berat)': [
+        "SEGERA rujuk ke Rumah Sakit atau Dokter Spesialis Anak.",
+        "Pemberian Pangan Olahan untuk Keperluan Medis Khusus (PKMK) di bawah pengawasan dokter.",
+        "Investigasi penyakit penyerta (seperti TBC, infeksi berulang) yang menghambat pertumbuhan.",
+        "Pemantauan pertumbuhan secara intensif setiap minggu."
+    ],
+    'Stunted (Stunting)': [
+        "Evaluasi pola makan: Wajib tambahkan satu porsi protein hewani (telur, ikan, ayam, daging) setiap kali makan.",
+        "Berikan Pemberian Makanan Tambahan (PMT) tinggi kalori dan protein.",
+        "Suplementasi mikronutrien (Taburia, Zinc, Vitamin A) sesuai anjuran Puskesmas/Posyandu.",
+        "Cek sanitasi lingkungan (air bersih dan jamban) serta perilaku hidup bersih."
+    ],
+    'Normal': [
+        "Pertahankan pola makan gizi seimbang (Isi Piringku).",
+        "Lanjutkan pemantauan pertumbuhan rutin di Posyandu setiap bulan.",
+        "Pastikan imunisasi dasar dan lanjutan lengkap.",
+        "Jaga kebersihan diri dan lingkungan untuk mencegah infeksi."
+    ],
+}
+
+
+# Cache hasil inferensi per (jenis kelamin, umur, tinggi, berat). Kunci
+# dikuantisasi ke ketelitian data posyandu (0.01 bulan, 0.1 cm, 0.1 kg);
+# masukan yang lebih teliti dari itu tidak di-cache agar hasil tidak berubah.
+UKURAN_CACHE_DEFAULT = 50000
+SKALA_KUANTUM = (100, 10, 10)
+
+
+def kunci_kuantum(gender, umur, tinggi, berat):
+    kunci = [kunci_gender(gender)]
+    for nilai, skala in zip((umur, tinggi, berat), SKALA_KUANTUM):
+        try:
+            q = round(nilai * skala)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if abs(nilai * skala - q) > 1e-6:
+            return None
+        kunci.append(q)
+    return tuple(kunci)
+
+
+class CacheAsesmen:
+    # LRU terbatas. `sidik` adalah hash tabel WHO dan rule fuzzy yang
+    # dipakai model; bila berbeda dari isi cache, seluruh isi dibuang.
+    def __init__(self, ukuran=UKURAN_CACHE_DEFAULT):
+        self.ukuran = ukuran
+        self._data = OrderedDict()
+        self._kunci = threading.Lock()
+        self.sidik = None
+        self.hit = self.miss = self.lewat = self.eviksi = 0
+
+    def cari(self, sidik, gender, umur, tinggi, berat):
+        kunci = kunci_kuantum(gender, umur, tinggi, berat)
+        with self._kunci:
+            if kunci is None:
+                self.lewat += 1
+                return None, None
+            if sidik != self.sidik:
+                self._data.clear()
+                self.sidik = sidik
+            hasil = self._data.get(kunci)
+            if hasil is None:
+                self.miss += 1
+            else:
+                self.hit += 1
+                self._data.move_to_end(kunci)
+            return kunci, hasil
+
+    def simpan(self, sidik, kunci, hasil):
+        with self._kunci:
+            if self.sidik is None:
+                self.sidik = sidik
+            elif sidik != self.sidik:
+                return
+            self._data[kunci] = hasil
+            self._data.move_to_end(kunci)
+            while len(self._data) > self.ukuran:
+                self._data.popitem(last=False)
+                self.eviksi += 1
+
+    def kosongkan(self):
+        with self._kunci:
+            self._data.clear()
+
+    def statistik(self):
+        with self._kunci:
+            total = self.hit + self.miss
+            return {'ukuran': self.ukuran, 'isi': len(self._data), 'hit': self.hit, 'miss': self.miss,
+                    'lewat': self.lewat, 'eviksi': self.eviksi,
+                    'rasio_hit': round(self.hit / total, 4) if total else None}
+
+
+class ModelStunting:
+    # Tabel referensi dan engine fuzzy hanya dibaca setelah dibuat, sehingga
+    # satu instance aman dipakai banyak thread dan, bila dimuat sebelum fork,
+    # dibagi copy-on-write oleh semua worker. Engine dan sidiknya disimpan
+    # sebagai satu tupel agar muat ulang aturan menukar keduanya sekaligus.
+    def __init__(self, referensi, engine, sidik=None, ukuran_cache=None):
+        self.referensi = referensi
+        self._aktif = (engine, sidik or model_cache.sidik_sumber(getattr(engine, 'konfig', None)))
+        if ukuran_cache is None:
+            ukuran_cache = int(os.environ.get('STUNTING_CACHE_ASESMEN', UKURAN_CACHE_DEFAULT))
+        self.cache = CacheAsesmen(ukuran_cache) if ukuran_cache > 0 else None
+
+        self._kunci_aturan = threading.Lock()
+        self.interval_aturan = float(os.environ.get('STUNTING_ATURAN_INTERVAL', 5))
+        self._cek_aturan = time.monotonic() + self.interval_aturan
+        try:
+            mtime = os.stat(PATH_ATURAN).st_mtime_ns
+        except OSError:
+            mtime = None
+        self.status_aturan = {'path': PATH_ATURAN, 'mtime': mtime, 'sidik': self.sidik,
+                              'dimuat': time.time(), 'galat': None}
+
+    @property
+    def engine(self):
+        return self._aktif[0]
+
+    @property
+    def sidik(self):
+        return self._aktif[1]
+
+    @classmethod
+    def muat(cls, mode_engine=None, pakai_cache=True):
+        mode = mode_engine or os.environ.get('STUNTING_ENGINE', 'compiled')
+        if mode == 'compiled' and pakai_cache:
+            dari_cache = model_cache.muat_cache(RESOLUSI_DEFAULT)
+            if dari_cache is not None:
+                return cls(*dari_cache)
+
+        model = cls(WHOReference.muat(), buat_engine(mode))
+        if mode == 'compiled' and pakai_cache:
+            try:
+                model_cache.bangun_cache(model.referensi, model.engine)
+            except OSError as e:
+                print(f"Cache model tidak dapat ditulis: {e}")
+        return model
+
+    def z_score(self, indikator, gender, umur, ukuran):
+        z = float(self.referensi.z_score(indikator, gender, umur, ukuran))
+        return z if np.isfinite(z) else 0
+
+    def inferensi(self, gender, umur, tinggi, berat):
+        engine, sidik = self._aktif
+        kunci = None
+        if self.cache is not None:
+            kunci, hasil = self.cache.cari(sidik, gender, umur, tinggi, berat)
+            if hasil is not None:
+                return hasil
+        hasil = self._hitung(engine, gender, umur, tinggi, berat)
+        if kunci is not None:
+            self.cache.simpan(sidik, kunci, hasil)
+        return hasil
+
+    def _hitung(self, engine, gender, umur, tinggi, berat):
+        with ukur('lms'):
+            z_tb = self.z_score('lhfa', gender, umur, tinggi)
+            z_bb = self.z_score('wfa', gender, umur, berat)
+        with ukur('fuzzy'):
+            skor = engine.skor(z_tb, z_bb)
+        return HasilInferensi(z_tb, z_bb, skor, *klasifikasi(skor))
+
+    def panaskan_cache(self, daftar_tupel):
+        # Isi cache dari tupel (gender, umur, tinggi, berat) yang paling sering
+        # muncul di riwayat, dihitung sekaligus lewat jalur batch.
+        if self.cache is None or not daftar_tupel:
+            return 0
+        sidik = self.sidik
+        gender, umur, tinggi, berat = (np.asarray(k) for k in zip(*daftar_tupel))
+        hasil = self.inferensi_batch(gender, umur.astype(float), tinggi.astype(float), berat.astype(float))
+        jumlah = 0
+        for i, tupel in enumerate(daftar_tupel[:self.cache.ukuran]):
+            kunci = kunci_kuantum(*tupel)
+            if kunci is None:
+                continue
+            self.cache.simpan(sidik, kunci, HasilInferensi(
+                float(hasil['z_tb'][i]), float(hasil['z_bb'][i]), float(hasil['skor'][i]),
+                str(hasil['kesimpulan'][i]), str(hasil['warna'][i])))
+            jumlah += 1
+        return jumlah
+
+    def inferensi_batch(self, gender, umur, tinggi, berat):
+        z_tb = np.nan_to_num(self.referensi.z_score('lhfa', gender, umur, tinggi))
+        z_bb = np.nan_to_num(self.referensi.z_score('wfa', gender, umur, berat))
+        skor = self.engine.skor_batch(z_tb, z_bb)
+        kesimpulan, warna = klasifikasi_batch(skor)
+        return {'z_tb': z_tb, 'z_bb': z_bb, 'skor': skor, 'kesimpulan': kesimpulan, 'warna': warna}
+
+    def muat_ulang_aturan(self, path=None):
+        # Engine baru dibangun dan diuji lengkap sebelum ditukar dalam satu
+        # assignment; permintaan yang sedang berjalan tetap memakai engine
+        # lama yang sudah dipegangnya. Bila gagal, engine lama tetap aktif.
+        path = path or PATH_ATURAN
+        with self._kunci_aturan:
+            mulai = time.perf_counter()
+            lama = self.engine
+            mtime = None
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                konfig = baca_aturan(path)
+                engine = buat_engine(lama.mode, resolusi=getattr(lama, 'resolusi', RESOLUSI_DEFAULT), konfig=konfig)
+                uji = engine.skor_batch(np.linspace(-4, 4, 9), np.linspace(4, -4, 9))
+                if not np.all(np.isfinite(uji)):
+                    raise ValueError("Engine hasil aturan baru menghasilkan skor tidak hingga")
+            except (OSError, ValueError) as e:
+                self.status_aturan.update(galat=str(e), mtime=mtime)
+                metrics.tambah('stunting_galat_total', tahap='muat_aturan')
+                raise
+            sidik = model_cache.sidik_sumber(konfig)
+            self._aktif = (engine, sidik)
+            self.status_aturan.update(path=path, mtime=mtime, sidik=sidik, dimuat=time.time(), galat=None)
+            print(f"Aturan fuzzy {path} dimuat ({len(konfig['aturan'])} aturan, sidik {sidik}) "
+                  f"dalam {time.perf_counter() - mulai:.1f} detik")
+
+        if engine.mode == 'compiled' and path == PATH_ATURAN:
+            try:
+                model_cache.bangun_cache(self.referensi, engine)
+            except OSError as e:
+                print(f"Cache model tidak dapat ditulis: {e}")
+        return sidik
+
+    def periksa_aturan(self):
+        # Dipanggil tiap permintaan, tetapi file aturan hanya diperiksa sekali
+        # per interval_aturan detik; bila berubah, dimuat ulang di thread latar.
+        if self.interval_aturan <= 0 or time.monotonic() < self._cek_aturan:
+            return
+        self._cek_aturan = time.monotonic() + self.interval_aturan
+        try:
+            mtime = os.stat(self.status_aturan['path']).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self.status_aturan['mtime'] and not self._kunci_aturan.locked():
+            self.status_aturan['mtime'] = mtime
+            threading.Thread(target=self._muat_ulang_latar, name='muat-aturan', daemon=True).start()
+
+    def _muat_ulang_latar(self):
+        try:
+            self.muat_ulang_aturan(self.status_aturan['path'])
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Aturan fuzzy baru ditolak, tetap memakai aturan lama: {e}")
+
+
+_model = {}
+_kunci_model = threading.Lock()
+
+
+def model_bersama(mode_engine=None):
+    # Satu model per mode per proses.
+    mode = mode_engine or os.environ.get('STUNTING_ENGINE', 'compiled')
+    with _kunci_model:
+        if mode not in _model:
+            _model[mode] = ModelStunting.muat(mode)
+        return _model[mode]
@@ -1,132 +1,52 @@
 from datetime import datetime
-import pandas as pd
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
 import os
+import sys
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from inferensi import model_bersama, ModelStunting, SARAN
+import model_cache
+from batch import skrining_batch, simpan_batch, populasi_sintetis
+from storage import buat_storage, migrasi_csv, PATH_CSV
+from growth import buat_id_anak
+from ekspor import ekspor_ke_file, MIMETYPE
+from impor import impor_file, nama_file_ditolak
+from statistik import kelompokkan
 
 class StuntingAI:
-    def __init__(self):
+    def __init__(self, engine=None):
         print("Sedang memuat data WHO...")
         try:
-            self.wfa_boys = pd.read_csv('dataset/wfa_boys_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            self.wfa_girls = pd.read_csv('dataset/wfa_girls_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            self.lhfa_boys = pd.read_csv('dataset/lhfa_boys_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            self.lhfa_girls = pd.read_csv('dataset/lhfa_girls_0-to-5-years_zscores.csv', sep=';', decimal=',')
-            
-            if 'c' in self.lhfa_boys.columns:
-                self.lhfa_boys.rename(columns={'c': 'Month'}, inplace=True)
-            if 'c' in self.lhfa_girls.columns:
-                self.lhfa_girls.rename(columns={'c': 'Month'}, inplace=True)
+            self.storage = buat_storage()
             
             print("Menyiapkan Logika Fuzzy...")
-            self.simulasi = self.set_up_fuzzy_system()
+            self.model = model_bersama(engine)
             print("Sistem SIAP! \n")
         except FileNotFoundError:
             print("Error: File dataset tidak ditemukan. Pastikan folder 'dataset' ada.")
 
-    def set_up_fuzzy_system(self):
-        z_tb  = ctrl.Antecedent(np.arange(-5, 6, 0.1), 'stunting_score')
-        z_bb  = ctrl.Antecedent(np.arange(-5, 6, 0.1), 'gizi_score')
-        output = ctrl.Consequent(np.arange(0, 101, 1), 'kondisi_anak')
-
-        z_tb['sangat_pendek'] = fuzz.trapmf(z_tb.universe, [-5, -5, -3.1, -2.9])
-        z_tb['pendek']        = fuzz.trimf(z_tb.universe, [-3.1, -2.5, -1.9])
-        z_tb['normal']        = fuzz.trapmf(z_tb.universe, [-2.1, -1, 3, 5])
-
-        z_bb['gizi_buruk']  = fuzz.trapmf(z_bb.universe, [-5, -5, -3.1, -2.9])
-        z_bb['gizi_kurang'] = fuzz.trimf(z_bb.universe, [-3.1, -2.5, -1.9])
-        z_bb['gizi_baik']   = fuzz.trapmf(z_bb.universe, [-2.1, 0, 1.9, 2.1])
-        z_bb['gizi_lebih']  = fuzz.trapmf(z_bb.universe, [1.9, 2.1, 5, 5])
-
-        output['severely_stunted'] = fuzz.trimf(output.universe, [0, 0, 45])
-        output['stunted']          = fuzz.trimf(output.universe, [40, 60, 80])
-        output['normal']           = fuzz.trimf(output.universe, [75, 100, 100])
-
-        rule1 = ctrl.Rule(z_tb['sangat_pendek'] | z_bb['gizi_buruk'], output['severely_stunted'])
-        rule2 = ctrl.Rule(z_tb['pendek'] & z_bb['gizi_baik'], output['stunted'])
-        rule3 = ctrl.Rule(z_tb['normal'] & z_bb['gizi_kurang'], output['stunted'])
-        rule4 = ctrl.Rule(z_tb['normal'] & z_bb['gizi_baik'], output['normal'])
-        rule5 = ctrl.Rule(z_tb['pendek'] & z_bb['gizi_kurang'], output['severely_stunted'])
-        rule6 = ctrl.Rule(z_tb['sangat_pendek'] & z_bb['gizi_lebih'], output['stunted'])
-            
-        simulasi = ctrl.ControlSystemSimulation(ctrl.ControlSystem([rule1, rule2, rule3, rule4, rule5, rule6]))
-        return simulasi
-
     def hitung_z_tb_u(self, gender, umur, tinggi):
-        if gender.lower() == 'laki-laki': std_data = self.lhfa_boys
-        else: std_data = self.lhfa_girls
-        
-        row = std_data[std_data['Month'] == umur]
-        if row.empty: return 0
-        L, M, S = row['L'].values[0], row['M'].values[0], row['S'].values[0]
-        return ((tinggi / M) ** L - 1) / (S * L)
+        return self.model.z_score('lhfa', gender, umur, tinggi)
 
     def hitung_z_bb_u(self, gender, umur, berat):
-        if gender.lower() == 'laki-laki': std_data = self.wfa_boys
-        else: std_data = self.wfa_girls
-
-        row = std_data[std_data['Month'] == umur]
-        if row.empty: return 0
-        L, M, S = row['L'].values[0], row['M'].values[0], row['S'].values[0]
-        return ((berat / M) ** L - 1) / (S * L)
+        return self.model.z_score('wfa', gender, umur, berat)
 
     def simpan_data(self, data_dict):
-        nama_file = 'dataset/laporan_hasil.csv'
-        df_baru = pd.DataFrame([data_dict])
-        
-        if not os.path.isfile(nama_file):
-            df_baru.to_csv(nama_file, index=False)
-        else:
-            df_baru.to_csv(nama_file, mode='a', header=False, index=False)
-            print(f"Data {data_dict['nama']} telah disimpan")
+        status = self.storage.simpan(data_dict)
+        print(f"Data {data_dict['nama']} telah disimpan")
+        return status
 
-    def analisa_kesehatan(self, nama, gender, umur, tinggi, berat):
-        z_tinggi = self.hitung_z_tb_u(gender, umur, tinggi)
-        z_berat  = self.hitung_z_bb_u(gender, umur, berat)
-        
-        z_tinggi_input = max(min(z_tinggi, 5), -5)
-        z_berat_input  = max(min(z_berat, 5), -5)
-        
-        self.simulasi.input['stunting_score'] = z_tinggi_input
-        self.simulasi.input['gizi_score']     = z_berat_input
-        
-        try:
-            self.simulasi.compute()
-            skor_akhir = self.simulasi.output['kondisi_anak']
-        except:
-            skor_akhir = 0
+    def analisa_kesehatan(self, nama, gender, umur, tinggi, berat, id_anak=None):
+        hasil = self.model.inferensi(gender, umur, tinggi, berat)
+        z_tinggi, z_berat, skor_akhir = hasil.z_tb, hasil.z_bb, hasil.skor
         
         status_text = ''
-        warna_css = ''
-        saran_list = []
+        kesimpulan, warna_css = hasil.kesimpulan, hasil.warna
+        saran = SARAN[kesimpulan]
         sarantxt = ''
-        
-        if skor_akhir < 45:
-            kesimpulan = 'Severely Stunted (Stunting Berat)'
-            saran = [
-                "SEGERA rujuk ke Rumah Sakit atau Dokter Spesialis Anak.",
-                "Pemberian Pangan Olahan untuk Keperluan Medis Khusus (PKMK) di bawah pengawasan dokter.",
-                "Investigasi penyakit penyerta (seperti TBC, infeksi berulang) yang menghambat pertumbuhan.",
-                "Pemantauan pertumbuhan secara intensif setiap minggu."
-            ]
-        elif skor_akhir < 75:
-            kesimpulan = 'Stunted (Stunting)'
-            saran = [
-                "Evaluasi pola makan: Wajib tambahkan satu porsi protein hewani (telur, ikan, ayam, daging) setiap kali makan.",
-                "Berikan Pemberian Makanan Tambahan (PMT) tinggi kalori dan protein.",
-                "Suplementasi mikronutrien (Taburia, Zinc, Vitamin A) sesuai anjuran Puskesmas/Posyandu.",
-                "Cek sanitasi lingkungan (air bersih dan jamban) serta perilaku hidup bersih."
-            ]
-        else:
-            kesimpulan = 'Normal'
-            saran = [
-                "Pertahankan pola makan gizi seimbang (Isi Piringku).",
-                "Lanjutkan pemantauan pertumbuhan rutin di Posyandu setiap bulan.",
-                "Pastikan imunisasi dasar dan lanjutan lengkap.",
-                "Jaga kebersihan diri dan lingkungan untuk mencegah infeksi."
-            ]
-            
+
         for i, poin in enumerate(saran):
             if i == 0:
                 sarantxt += f'- {poin}\n'
@@ -154,18 +74,30 @@ class StuntingAI:
             'Kesimpulan': kesimpulan,
             'status': status_text,
             'warna': warna_css,    
-            'saran': saran_list
+            'saran': saran,
+            'id_anak': buat_id_anak(nama, gender, id_anak)
         }
         
-        self.simpan_data(data_hasil)
+        pertumbuhan = self.simpan_data(data_hasil)
+        if pertumbuhan and pertumbuhan['jumlah_kunjungan'] > 1:
+            print(f"Kunjungan ke : {pertumbuhan['jumlah_kunjungan']} (selang {pertumbuhan['selang_bulan']} bulan)")
+            if pertumbuhan['kecepatan_z_tb'] is not None:
+                print(f"Kecepatan Z  : TB/U {pertumbuhan['kecepatan_z_tb']:+.2f} SD/bulan, "
+                      f"BB/U {pertumbuhan['kecepatan_z_bb']:+.2f} SD/bulan")
+            if pertumbuhan['transisi']:
+                print(f"Perubahan    : {pertumbuhan['transisi']}")
+            if pertumbuhan['faltering']:
+                print("PERINGATAN   : Pertumbuhan anak melambat (growth faltering)!")
+            print("-------------------------------\n")
+        data_hasil['pertumbuhan'] = pertumbuhan
         return data_hasil
     
-def input_user():
+def input_user(engine=None):
     print("\n==============================================")
     print("   SISTEM DETEKSI STUNTING & GIZI (AI)   ")
     print("==============================================")
     
-    aplikasi = StuntingAI()
+    aplikasi = StuntingAI(engine)
     
     while True:
         print("\n----------------------------------------------")
@@ -181,6 +113,7 @@ def input_user():
             try:
                 print ("\n--- Input Data Anak ---")
                 nama   = input("Nama Anak       : ")
+                id_anak = input("No. KIA/ID Anak (opsional): ")
                 
                 gender = ''
                 while True:
@@ -217,7 +150,7 @@ def input_user():
                 tinggi = float(input("Tinggi Badan (cm): "))
                 berat  = float(input("Berat Badan (kg) : "))
                 
-                aplikasi.analisa_kesehatan(nama, gender, umur_bulan, tinggi, berat)
+                aplikasi.analisa_kesehatan(nama, gender, umur_bulan, tinggi, berat, id_anak)
                 input("Tekan enter untuk melanjutkan")
                 
             except ValueError:
@@ -233,5 +166,265 @@ def input_user():
         else:
             print("Pilihan tidak valid. Silakan coba lagi.")
             
+def jalankan_batch(args):
+    import pandas as pd
+
+    aplikasi = StuntingAI(args.engine)
+    hasil = skrining_batch(aplikasi, pd.read_csv(args.input, sep=args.sep))
+    output = args.output or os.path.splitext(args.input)[0] + '_hasil.csv'
+    hasil.to_csv(output, index=False)
+
+    print(f"{len(hasil)} anak diperiksa, hasil ditulis ke {output}")
+    print(hasil['Kesimpulan'].value_counts().to_string())
+    if args.simpan:
+        jumlah = simpan_batch(hasil, aplikasi.storage)
+        print(f"{jumlah} data ditambahkan ke laporan")
+
+
+def jalankan_ekspor(args):
+    mulai = time.perf_counter()
+    jumlah = ekspor_ke_file(buat_storage(), args.output, args.format, args.blok,
+                            dari=args.dari, sampai=args.sampai, kesimpulan=args.kesimpulan)
+    print(f"{jumlah} pemeriksaan diekspor ke {args.output} dalam {time.perf_counter() - mulai:.1f} detik")
+
+
+def jalankan_impor(args):
+    aplikasi = StuntingAI(args.engine)
+    path_ditolak = nama_file_ditolak(args.input)
+    mulai = time.perf_counter()
+    try:
+        ringkasan = impor_file(aplikasi, args.input, args.format, args.blok, args.sep, path_ditolak, uji=args.uji)
+    except ValueError as e:
+        print(f"[DITOLAK] {e}")
+        sys.exit(1)
+    print(f"Dibaca {ringkasan['dibaca']}, {'akan disimpan' if args.uji else 'disimpan'} {ringkasan['disimpan']}, "
+          f"duplikat {ringkasan['duplikat']}, ditolak {ringkasan['ditolak']} "
+          f"({time.perf_counter() - mulai:.1f} detik)")
+    print(f"Kesimpulan berbeda dari file sumber setelah dihitung ulang: {ringkasan['kesimpulan_berubah']}")
+    if ringkasan['ditolak']:
+        print(f"Baris yang ditolak beserta alasannya: {path_ditolak}")
+
+
+def tampilkan_statistik(args):
+    storage = buat_storage()
+    if args.bangun_ulang:
+        print(f"{storage.bangun_ulang_statistik()} kelompok agregat dihitung ulang")
+    print(f"{'Periode':<9}{'N':>8}{'Stunting':>10}{'St.Berat':>10}{'Underwt':>10}{'Z TB':>8}{'Z BB':>8}")
+    for periode, r in kelompokkan(storage.statistik(), 'periode'):
+        print(f"{periode:<9}{r['n']:>8}{r['persen_stunting']:>9}%{r['persen_stunting_berat']:>9}%"
+              f"{r['persen_underweight']:>9}%{r['rata_z_tb']:>8}{r['rata_z_bb']:>8}")
+
+
+def bangun_cache():
+    mulai = time.perf_counter()
+    model = ModelStunting.muat('compiled', pakai_cache=False)
+    manifest = model_cache.bangun_cache(model.referensi, model.engine)
+    print(f"Cache ditulis ke {model_cache.DIR_CACHE} ({len(manifest['tabel'])} tabel WHO, "
+          f"resolusi fuzzy {manifest['fuzzy']['resolusi']}) dalam {time.perf_counter() - mulai:.1f} detik")
+
+
+def cek_aturan(args):
+    # Validasi file aturan sebelum dipasang: kompilasi, bandingkan dengan
+    # skfuzzy, dan hitung kesimpulan yang berubah pada populasi golden.
+    import pandas as pd
+    from aturan_fuzzy import baca_aturan
+    from fuzzy_engine import FuzzyEngineCompiled
+    from benchmark import PATH_GOLDEN
+
+    try:
+        konfig = baca_aturan(args.path)
+    except (OSError, ValueError) as e:
+        print(f"[DITOLAK] {e}")
+        sys.exit(1)
+    mulai = time.perf_counter()
+    engine = FuzzyEngineCompiled(konfig)
+    print(f"{args.path}: {len(konfig['aturan'])} aturan valid, dikompilasi dalam {time.perf_counter() - mulai:.1f} detik")
+    galat, titik = engine.galat_maksimum(args.kepadatan)
+    print(f"Galat maks terhadap skfuzzy: {galat:.4f} di (TB={titik[0]:.3f}, BB={titik[1]:.3f})")
+
+    aktif = model_bersama('compiled')
+    golden = pd.read_csv(PATH_GOLDEN)
+    masukan = [golden[k].to_numpy() for k in ('gender', 'umur', 'tinggi', 'berat')]
+    lama = aktif.inferensi_batch(*masukan)
+    baru = ModelStunting(aktif.referensi, engine, ukuran_cache=0).inferensi_batch(*masukan)
+    berubah = lama['kesimpulan'] != baru['kesimpulan']
+    print(f"Kesimpulan berubah dibanding aturan aktif: {int(berubah.sum())} dari {len(golden)} anak")
+    for (a, b), n in pd.Series(list(zip(lama['kesimpulan'][berubah], baru['kesimpulan'][berubah]))).value_counts().items():
+        print(f"  {a} -> {b}: {n}")
+
+
+def jalankan_sinkron(args):
+    import urllib.error
+    from sinkron import sinkronkan, token_sinkron
+
+    if not token_sinkron():
+        print("Set STUNTING_SINKRON_TOKEN dengan token yang sama seperti di server pusat.")
+        sys.exit(1)
+    try:
+        r = sinkronkan(buat_storage(sinkron=True), args.server, args.batch)
+    except ValueError as e:
+        print(f"[DITOLAK] {e}")
+        sys.exit(1)
+    except urllib.error.HTTPError as e:
+        print(f"Server {args.server} menolak permintaan (HTTP {e.code}); periksa STUNTING_SINKRON_TOKEN.")
+        sys.exit(1)
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Server {args.server} tidak dapat dihubungi ({e}); data tetap di log lokal dan "
+              f"sinkron berikutnya melanjutkan dari kursor terakhir.")
+        sys.exit(1)
+    print(f"Dikirim {r['dikirim']} ({r['byte_kirim']} byte), diterima {r['diterima']} ({r['byte_terima']} byte), "
+          f"duplikat dilewati {r['duplikat'] + r['ditolak_server']}, {r['detik']} detik")
+
+
+def _inferensi_potongan(args):
+    mode, potongan = args
+    model = model_bersama(mode)
+    return [model.inferensi(*baris) for baris in potongan]
+
+
+def uji_beban(args):
+    model = model_bersama(args.engine)
+    populasi = populasi_sintetis(args.jumlah, model.referensi, seed=args.seed)
+    data = list(populasi[['gender', 'umur', 'tinggi', 'berat']].itertuples(index=False, name=None))
+
+    # Cache asesmen dikosongkan sebelum tiap tahap agar angka throughput
+    # tidak hanya mengukur cache yang sudah terisi tahap sebelumnya.
+    kosongkan_cache = model.cache.kosongkan if model.cache is not None else (lambda: None)
+
+    mulai = time.perf_counter()
+    acuan = [model.inferensi(*baris) for baris in data]
+    print(f"Sekuensial      : {len(data) / (time.perf_counter() - mulai):10.0f} anak/detik")
+
+    # Urutan diacak supaya thread saling menyela di tengah inferensi anak lain.
+    urutan = np.random.default_rng(args.seed).permutation(len(data))
+    kosongkan_cache()
+    mulai = time.perf_counter()
+    with ThreadPoolExecutor(args.thread) as pool:
+        hasil_thread = dict(zip(urutan, pool.map(lambda i: model.inferensi(*data[i]), urutan)))
+    print(f"{args.thread:>2} thread       : {len(data) / (time.perf_counter() - mulai):10.0f} anak/detik")
+    salah = sum(hasil_thread[i] != acuan[i] for i in range(len(data)))
+
+    if args.proses > 1:
+        # Dengan fork, worker mewarisi model yang sudah dimuat (copy-on-write).
+        konteks = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        potongan = [(args.engine, data[i::args.proses]) for i in range(args.proses)]
+        kosongkan_cache()
+        mulai = time.perf_counter()
+        with ProcessPoolExecutor(args.proses, mp_context=konteks) as pool:
+            hasil_proses = list(pool.map(_inferensi_potongan, potongan))
+        print(f"{args.proses:>2} proses       : {len(data) / (time.perf_counter() - mulai):10.0f} anak/detik")
+        for i, bagian in enumerate(hasil_proses):
+            salah += sum(h != a for h, a in zip(bagian, acuan[i::args.proses]))
+
+    if model.cache is not None:
+        st = model.cache.statistik()
+        print(f"Cache asesmen   : hit {st['hit']}, miss {st['miss']}, lewat {st['lewat']}, rasio {st['rasio_hit']}")
+    print(f"Hasil berbeda dari sekuensial: {salah}")
+    return salah
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sistem Deteksi Stunting & Gizi")
+    parser.add_argument('--engine', choices=['compiled', 'exact'], default=None)
+    sub = parser.add_subparsers(dest='perintah')
+
+    p_batch = sub.add_parser('batch', help="Skrining massal dari file CSV")
+    p_batch.add_argument('input', help="CSV berisi kolom nama, gender, umur (bulan), tinggi, berat")
+    p_batch.add_argument('-o', '--output', help="File CSV hasil (default: <input>_hasil.csv)")
+    p_batch.add_argument('--sep', default=',')
+    p_batch.add_argument('--simpan', action='store_true', help="Tambahkan hasil ke dataset/laporan_hasil.csv")
+
+    p_migrasi = sub.add_parser('migrasi', help="Pindahkan laporan CSV lama ke penyimpanan aktif")
+    p_migrasi.add_argument('csv', nargs='?', default=PATH_CSV)
+    p_migrasi.add_argument('--paksa', action='store_true', help="Tetap migrasi walau tujuan sudah berisi data")
+
+    p_faltering = sub.add_parser('faltering', help="Daftar anak dengan pertumbuhan melambat")
+    p_faltering.add_argument('--batas', type=int, default=50)
+
+    p_statistik = sub.add_parser('statistik', help="Prevalensi stunting/underweight per bulan")
+    p_statistik.add_argument('--bangun-ulang', action='store_true', help="Hitung ulang agregat dari seluruh riwayat")
+
+    p_ekspor = sub.add_parser('ekspor', help="Ekspor riwayat pemeriksaan (csv, ndjson, parquet)")
+    p_ekspor.add_argument('output', help="File tujuan; format dari ekstensi bila --format tidak diisi")
+    p_ekspor.add_argument('--format', choices=list(MIMETYPE))
+    p_ekspor.add_argument('--dari', help="Tanggal awal YYYY-MM-DD")
+    p_ekspor.add_argument('--sampai', help="Tanggal akhir YYYY-MM-DD")
+    p_ekspor.add_argument('--kesimpulan')
+    p_ekspor.add_argument('--blok', type=int, default=5000)
+
+    p_impor = sub.add_parser('impor', help="Impor riwayat lama; skor dihitung ulang dan duplikat dilewati")
+    p_impor.add_argument('input')
+    p_impor.add_argument('--format', choices=list(MIMETYPE))
+    p_impor.add_argument('--sep', default=',')
+    p_impor.add_argument('--blok', type=int, default=5000)
+    p_impor.add_argument('--uji', action='store_true', help="Validasi dan hitung saja tanpa menyimpan "
+                         "(duplikat antar-blok dalam file yang sama tidak terdeteksi)")
+
+    sub.add_parser('bangun-cache', help="Bangun ulang cache biner tabel WHO dan model fuzzy")
+
+    p_sinkron = sub.add_parser('sinkron', help="Kirim pemeriksaan baru ke server pusat dan ambil milik posyandu lain")
+    p_sinkron.add_argument('--server', required=True)
+    p_sinkron.add_argument('--batch', type=int, default=1000)
+
+    p_pusat = sub.add_parser('pusat', help="Jalankan server pusat sinkronisasi (tanpa model fuzzy)")
+    p_pusat.add_argument('--host', default='0.0.0.0')
+    p_pusat.add_argument('--port', type=int, default=8100)
+
+    p_uji_sinkron = sub.add_parser('uji-sinkron', help="Uji sinkron dua posyandu lokal dengan server pusat sementara")
+    p_uji_sinkron.add_argument('--jumlah', type=int, default=5000)
+    p_uji_sinkron.add_argument('--tambahan', type=int, default=50)
+    p_uji_sinkron.add_argument('--batch', type=int, default=1000)
+
+    p_aturan = sub.add_parser('cek-aturan', help="Validasi file aturan fuzzy dan bandingkan dengan aturan aktif")
+    p_aturan.add_argument('path')
+    p_aturan.add_argument('--kepadatan', type=int, default=4, help="Titik uji per sel grid per sumbu")
+
+    p_beban = sub.add_parser('uji-beban', help="Uji inferensi paralel (thread & proses) terhadap hasil sekuensial")
+    p_beban.add_argument('--jumlah', type=int, default=5000)
+    p_beban.add_argument('--thread', type=int, default=16)
+    p_beban.add_argument('--proses', type=int, default=4)
+    p_beban.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.perintah == 'ekspor':
+        jalankan_ekspor(args)
+    elif args.perintah == 'impor':
+        jalankan_impor(args)
+    elif args.perintah == 'bangun-cache':
+        bangun_cache()
+    elif args.perintah == 'sinkron':
+        jalankan_sinkron(args)
+    elif args.perintah == 'pusat':
+        from sinkron import buat_server_pusat, token_sinkron
+        if not token_sinkron():
+            parser.error("pusat membutuhkan STUNTING_SINKRON_TOKEN (token bersama untuk semua posyandu)")
+        try:
+            storage = buat_storage(sinkron=True)
+        except ValueError as e:
+            parser.error(str(e))
+        buat_server_pusat(storage).run(host=args.host, port=args.port)
+    elif args.perintah == 'uji-sinkron':
+        from sinkron import uji_sinkron
+        if uji_sinkron(args.jumlah, args.tambahan, args.batch):
+            sys.exit(1)
+    elif args.perintah == 'cek-aturan':
+        cek_aturan(args)
+    elif args.perintah == 'uji-beban':
+        if uji_beban(args):
+            sys.exit(1)
+    elif args.perintah == 'statistik':
+        tampilkan_statistik(args)
+    elif args.perintah == 'faltering':
+        for status in buat_storage().anak_faltering(args.batas):
+            print(f"{status['tanggal_terakhir']}  {status['nama']:<25} {status['kesimpulan_terakhir']:<35} "
+                  f"{status['transisi'] or '-'}")
+    elif args.perintah == 'batch':
+        jalankan_batch(args)
+    elif args.perintah == 'migrasi':
+        migrasi_csv(buat_storage(), args.csv, paksa=args.paksa)
+    else:
+        input_user(args.engine)
+
+
 if __name__ == "__main__":
-    input_user()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Metrik ringan dalam format teks Prometheus. Semua nilai disimpan per proses
+# (tiap worker gunicorn punya angkanya sendiri). Bila STUNTING_METRICS=0,
+# ukur() mengembalikan objek kosong yang sama sehingga biayanya hanya satu
+# pemanggilan fungsi.
+AKTIF = os.environ.get('STUNTING_METRICS', '1') != '0'
+
+BATAS_DETIK = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+KETERANGAN = {
+    'stunting_durasi_tahap_detik': ('histogram', "Durasi tiap tahap pemrosesan (lms, fuzzy, simpan, render, ...)"),
+    'stunting_durasi_request_detik': ('histogram', "Durasi request HTTP per route"),
+    'stunting_request_total': ('counter', "Jumlah request HTTP per route dan status"),
+    'stunting_galat_total': ('counter', "Jumlah galat per tahap"),
+    'stunting_asesmen_total': ('counter', "Jumlah asesmen per kesimpulan"),
+    'stunting_uptime_detik': ('gauge', "Lama proses berjalan"),
+}
+
+_kunci = threading.Lock()
+_histogram = {}
+_counter = {}
+_pengumpul = []
+_mulai = time.time()
+
+
+def _label(label):
+    return tuple(sorted(label.items()))
+
+
+def amati(nama, detik, **label):
+    if not AKTIF:
+        return
+    kunci = (nama, _label(label))
+    with _kunci:
+        data = _histogram.get(kunci)
+        if data is None:
+            data = _histogram[kunci] = [0] * (len(BATAS_DETIK) + 1) + [0.0]
+        data[bisect_left(BATAS_DETIK, detik)] += 1
+        data[-1] += detik
+
+
+def tambah(nama, nilai=1, **label):
+    if not AKTIF:
+        return
+    kunci = (nama, _label(label))
+    with _kunci:
+        _counter[kunci] = _counter.get(kunci, 0) + nilai
+
+
+class _Pengukur:
+    __slots__ = ('tahap', 'mulai')
+
+    def __init__(self, tahap):
+        self.tahap = tahap
+
+    def __enter__(self):
+        self.mulai = time.perf_counter()
+        return self
+
+    def __exit__(self, jenis, nilai, tb):
+        amati('stunting_durasi_tahap_detik', time.perf_counter() - self.mulai, tahap=self.tahap)
+        if jenis is not None:
+            tambah('stunting_galat_total', tahap=self.tahap)
+        return False
+
+
+class _Kosong:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, jenis, nilai, tb):
+        return False
+
+
+_KOSONG = _Kosong()
+
+
+def ukur(tahap):
+    return _Pengukur(tahap) if AKTIF else _KOSONG
+
+
+def daftarkan_pengumpul(fungsi):
+    # fungsi() -> [(nama, jenis, keterangan, [(label dict, nilai), ...]), ...]
+    # dipanggil saat /metrics dibaca, untuk nilai yang sudah dihitung di tempat
+    # lain (mis. penghitung cache).
+    _pengumpul.append(fungsi)
+
+
+def reset():
+    with _kunci:
+        _histogram.clear()
+        _counter.clear()
+
+
+def _format_label(label, tambahan=()):
+    isi = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+           for k, v in tuple(label) + tuple(tambahan)]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in isi) + '}' if isi else ''
+
+
+def ekspor():
+    with _kunci:
+        histogram = {k: list(v) for k, v in _histogram.items()}
+        counter = dict(_counter)
+
+    baris = []
+    for nama, (jenis, keterangan) in KETERANGAN.items():
+        baris += [f'# HELP {nama} {keterangan}', f'# TYPE {nama} {jenis}']
+        if nama == 'stunting_uptime_detik':
+            baris.append(f'{nama} {time.time() - _mulai:.3f}')
+        for (n, label), nilai in sorted(counter.items()):
+            if n == nama:
+                baris.append(f'{nama}{_format_label(label)} {nilai}')
+        for (n, label), data in sorted(histogram.items()):
+            if n != nama:
+                continue
+            kumulatif = 0
+            for batas, jumlah in zip(BATAS_DETIK + ('+Inf',), data[:-1]):
+                kumulatif += jumlah
+                baris.append(f'{nama}_bucket{_format_label(label, [("le", batas)])} {kumulatif}')
+            baris.append(f'{nama}_sum{_format_label(label)} {data[-1]:.6f}')
+            baris.append(f'{nama}_count{_format_label(label)} {kumulatif}')
+    for fungsi in _pengumpul:
+        for nama, jenis, keterangan, sampel in fungsi():
+            baris += [f'# HELP {nama} {keterangan}', f'# TYPE {nama} {jenis}']
+            baris += [f'{nama}{_format_label(sorted(label.items()))} {nilai}' for label, nilai in sampel]
+    return '\n'.join(baris) + '\n'
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Cache biner hasil parsing tabel WHO dan permukaan fuzzy terkompilasi.
+# Array disimpan sebagai .npy agar bisa dibuka dengan mmap (tanpa parsing dan
+# dibagi antar proses lewat page cache). Manifest ditulis paling akhir dan
+# menyimpan hash file sumber; cache dianggap basi bila ada yang berubah.
+DIR_CACHE = os.environ.get('STUNTING_CACHE_DIR', 'dataset/cache')
+VERSI_CACHE = 2
+FILE_MANIFEST = 'manifest.json'
+
+
+def _file_sumber():
+    from who_reference import TABEL_WHO
+    from aturan_fuzzy import PATH_ATURAN
+    kode = os.path.dirname(os.path.abspath(__file__))
+    return sorted(TABEL_WHO.values()) + [os.path.join(kode, 'fuzzy_engine.py'), os.path.join(kode, 'aturan_fuzzy.py'),
+                                         PATH_ATURAN]
+
+
+def hash_sumber(konfig=None):
+    # Bila konfigurasi aturan sudah dibaca, hash-nya dipakai langsung agar
+    # sama dengan rule yang benar-benar dimuat.
+    from aturan_fuzzy import PATH_ATURAN
+    hasil = {}
+    for path in _file_sumber():
+        if path == PATH_ATURAN and konfig is not None and konfig.get('sha256'):
+            hasil[os.path.basename(path)] = konfig['sha256']
+            continue
+        with open(path, 'rb') as f:
+            hasil[os.path.basename(path)] = hashlib.sha256(f.read()).hexdigest()
+    return hasil
+
+
+def sidik_sumber(konfig=None):
+    # Ringkasan pendek hash_sumber(), dipakai sebagai versi model.
+    isi = json.dumps(hash_sumber(konfig), sort_keys=True).encode()
+    return hashlib.sha256(isi).hexdigest()[:16]
+
+
+def _simpan_array(direktori, nama, array):
+    path = os.path.join(direktori, nama)
+    sementara = f'{path}.{os.getpid()}.tmp'
+    with open(sementara, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(sementara, path)
+    return nama
+
+
+def bangun_cache(referensi, engine, direktori=DIR_CACHE):
+    os.makedirs(direktori, exist_ok=True)
+    manifest = {
+        'versi': VERSI_CACHE,
+        'sumber': hash_sumber(getattr(engine, 'konfig', None)),
+        'tabel': [],
+        'fuzzy': {
+            'resolusi': engine.resolusi,
+            'momen': _simpan_array(direktori, f'fuzzy_momen_{engine.resolusi}.npy', engine.permukaan_momen),
+            'luas': _simpan_array(direktori, f'fuzzy_luas_{engine.resolusi}.npy', engine.permukaan_luas),
+            'galat_sel': _simpan_array(direktori, f'fuzzy_galat_{engine.resolusi}.npy', engine.galat_sel),
+        },
+    }
+    for (indikator, gender), (awal, langkah, data) in referensi.tabel.items():
+        manifest['tabel'].append({
+            'indikator': indikator, 'gender': gender, 'awal': awal, 'langkah': langkah,
+            'data': _simpan_array(direktori, f'who_{indikator}_{gender}.npy', data),
+        })
+
+    path = os.path.join(direktori, FILE_MANIFEST)
+    sementara = f'{path}.{os.getpid()}.tmp'
+    with open(sementara, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(sementara, path)
+    return manifest
+
+
+def muat_cache(resolusi, direktori=DIR_CACHE):
+    # Mengembalikan (WHOReference, FuzzyEngineCompiled) atau None bila cache
+    # tidak ada, beda versi/resolusi, atau file sumber sudah berubah.
+    from who_reference import WHOReference
+    from fuzzy_engine import FuzzyEngineCompiled
+    from aturan_fuzzy import baca_aturan
+
+    try:
+        with open(os.path.join(direktori, FILE_MANIFEST)) as f:
+            manifest = json.load(f)
+        # Aturan dibaca dulu agar hash yang dicocokkan adalah isi yang dipakai
+        # evaluator untuk titik exact.
+        konfig = baca_aturan()
+        if (manifest['versi'] != VERSI_CACHE or manifest['fuzzy']['resolusi'] != resolusi
+                or manifest['sumber'] != hash_sumber(konfig)):
+            return None
+
+        def buka(nama):
+            return np.load(os.path.join(direktori, nama), mmap_mode='r')
+
+        tabel = {(t['indikator'], t['gender']): (t['awal'], t['langkah'], buka(t['data']))
+                 for t in manifest['tabel']}
+        engine = FuzzyEngineCompiled.dari_permukaan(resolusi, buka(manifest['fuzzy']['momen']),
+                                                    buka(manifest['fuzzy']['luas']),
+                                                    buka(manifest['fuzzy']['galat_sel']), konfig)
+        return WHOReference(tabel), engine
+    except (OSError, KeyError, ValueError):
+        return None
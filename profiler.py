@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Profiler sampling: sebuah thread latar mengambil stack semua thread lain
+# setiap `interval` detik. Hasilnya dalam format "collapsed stack"
+# (fungsi;fungsi;fungsi jumlah) yang bisa langsung dibuat flame graph.
+# Tidak ada biaya sama sekali selama profiler tidak dijalankan.
+INTERVAL_DEFAULT = 0.005
+DIIZINKAN = os.environ.get('STUNTING_PROFILER', '0') == '1'
+
+
+class ProfilerSampling:
+    def __init__(self):
+        self._kunci = threading.Lock()
+        self._thread = None
+        self._berhenti = threading.Event()
+        self.interval = INTERVAL_DEFAULT
+        self.reset()
+
+    @property
+    def aktif(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def reset(self):
+        with self._kunci:
+            self.sampel = Counter()
+            self.jumlah_sampel = 0
+            self.mulai_pada = time.time()
+
+    def mulai(self, interval=None):
+        with self._kunci:
+            if interval:
+                self.interval = max(float(interval), 0.001)
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._berhenti.clear()
+            self._thread = threading.Thread(target=self._jalan, name='profiler-sampling', daemon=True)
+            self._thread.start()
+            return True
+
+    def berhenti(self):
+        thread = self._thread
+        if thread is None:
+            return False
+        self._berhenti.set()
+        thread.join()
+        self._thread = None
+        return True
+
+    def _jalan(self):
+        sendiri = threading.get_ident()
+        while not self._berhenti.wait(self.interval):
+            tumpukan = []
+            for ident, frame in sys._current_frames().items():
+                if ident == sendiri:
+                    continue
+                fungsi = []
+                while frame is not None:
+                    kode = frame.f_code
+                    fungsi.append(f"{os.path.basename(kode.co_filename)}:{kode.co_name}")
+                    frame = frame.f_back
+                tumpukan.append(';'.join(reversed(fungsi)))
+            with self._kunci:
+                self.sampel.update(tumpukan)
+                self.jumlah_sampel += 1
+
+    def collapsed(self, batas=None):
+        with self._kunci:
+            teratas = self.sampel.most_common(batas)
+        return ''.join(f"{stack} {jumlah}\n" for stack, jumlah in teratas)
+
+    def status(self):
+        return {'aktif': self.aktif, 'diizinkan': DIIZINKAN, 'interval': self.interval,
+                'jumlah_sampel': self.jumlah_sampel, 'jumlah_stack': len(self.sampel),
+                'sejak': self.mulai_pada, 'pid': os.getpid()}
+
+
+sampler = ProfilerSampling()
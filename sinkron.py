@@ -0,0 +1,257 @@
+import gzip
+import hmac
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from flask import Blueprint, Flask, Response, jsonify, request
+from storage import KOLOM
+
+# Sinkronisasi offline-first antar instansi posyandu lewat server pusat.
+# Setiap pemeriksaan punya uid global dan tercatat di log_perubahan (urut
+# seq). Instansi mendorong pemeriksaan miliknya sejak kursor terakhir, lalu
+# menarik pemeriksaan instansi lain dari log server sejak kursornya sendiri;
+# kursor baru dimajukan setelah batch diterima, jadi koneksi yang putus di
+# tengah jalan cukup diulang. Penerima melewati uid yang sudah ada dan
+# pemeriksaan yang sama (kunci_duplikat), sehingga batch boleh terkirim ulang.
+#
+# Format batch: JSON kolumnar {versi, asal, sampai, kolom, baris} yang
+# dikompresi gzip. Ukuran dan waktu sebanding dengan jumlah pemeriksaan
+# baru, bukan panjang riwayat.
+#
+# Endpoint hanya dipasang di server pusat (main.py pusat), tidak di aplikasi
+# posyandu, dan setiap permintaan harus membawa token bersama
+# (STUNTING_SINKRON_TOKEN) di header X-Sinkron-Token.
+VERSI_SINKRON = 1
+KOLOM_SINKRON = list(KOLOM)
+UKURAN_BATCH = 1000
+BATAS_BATCH = 5000
+MIMETYPE_BATCH = 'application/gzip'
+HEADER_TOKEN = 'X-Sinkron-Token'
+
+
+def token_sinkron():
+    return os.environ.get('STUNTING_SINKRON_TOKEN', '')
+
+
+def kemas(records, asal, sampai):
+    isi = {
+        'versi': VERSI_SINKRON,
+        'asal': asal,
+        'sampai': sampai,
+        'kolom': KOLOM_SINKRON,
+        'baris': [[r.get(k) for k in KOLOM_SINKRON] for r in records],
+    }
+    return gzip.compress(json.dumps(isi, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), compresslevel=6)
+
+
+def buka(data):
+    try:
+        isi = json.loads(gzip.decompress(data))
+    except (OSError, EOFError, ValueError) as e:
+        raise ValueError(f"Batch sinkronisasi rusak: {e}")
+    if not isinstance(isi, dict) or isi.get('versi') != VERSI_SINKRON:
+        raise ValueError(f"Versi batch sinkronisasi harus {VERSI_SINKRON}")
+    kolom = isi.get('kolom')
+    if not isinstance(kolom, list) or 'uid' not in kolom or not isinstance(isi.get('baris'), list):
+        raise ValueError("Batch sinkronisasi harus berisi kolom (dengan uid) dan baris")
+    if not isinstance(isi.get('asal'), str) or not isinstance(isi.get('sampai'), int):
+        raise ValueError("Batch sinkronisasi harus berisi asal dan sampai")
+    isi['records'] = [dict(zip(kolom, b)) for b in isi['baris']]
+    return isi
+
+
+def buat_api_sinkron(storage, token):
+    if not token:
+        raise ValueError("Token sinkronisasi kosong; set STUNTING_SINKRON_TOKEN")
+    api = Blueprint('sinkron', __name__)
+
+    @api.before_request
+    def cek_token():
+        if not hmac.compare_digest(request.headers.get(HEADER_TOKEN, '').encode(), token.encode()):
+            return jsonify(error="Token sinkronisasi tidak valid"), 401
+
+    @api.route('/dorong', methods=['POST'])
+    def dorong():
+        try:
+            batch = buka(request.get_data())
+            disimpan, duplikat = storage.simpan_sinkron(batch['records'], batch['asal'])
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(disimpan=disimpan, duplikat=duplikat, instansi=storage.instansi)
+
+    @api.route('/tarik')
+    def tarik():
+        sejak = request.args.get('sejak', 0, type=int)
+        batas = max(1, min(request.args.get('batas', UKURAN_BATCH, type=int), BATAS_BATCH))
+        records, sampai = storage.log_sejak(sejak, batas, kecuali=request.args.get('kecuali'))
+        return Response(kemas(records, storage.instansi, sampai), mimetype=MIMETYPE_BATCH)
+
+    return api
+
+
+def _minta(url, token, data=None, batas_waktu=30):
+    headers = {HEADER_TOKEN: token}
+    if data is not None:
+        headers['Content-Type'] = MIMETYPE_BATCH
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=batas_waktu) as r:
+        return r.read()
+
+
+def sinkronkan(storage, server, ukuran_batch=UKURAN_BATCH, batas_waktu=30, token=None):
+    # Dorong lalu tarik. Galat jaringan (OSError/URLError) diteruskan ke
+    # pemanggil; kursor yang sudah tersimpan tetap berlaku.
+    server = server.rstrip('/')
+    token = token_sinkron() if token is None else token
+    ringkasan = {'dikirim': 0, 'ditolak_server': 0, 'diterima': 0, 'duplikat': 0,
+                 'byte_kirim': 0, 'byte_terima': 0}
+    mulai = time.perf_counter()
+
+    kunci = f'dorong:{server}'
+    sejak = storage.kursor(kunci)
+    while True:
+        records, sampai = storage.log_sejak(sejak, ukuran_batch, asal=storage.instansi)
+        if records:
+            data = kemas(records, storage.instansi, sampai)
+            jawaban = json.loads(_minta(f'{server}/sinkron/dorong', token, data, batas_waktu))
+            ringkasan['dikirim'] += jawaban['disimpan']
+            ringkasan['ditolak_server'] += jawaban['duplikat']
+            ringkasan['byte_kirim'] += len(data)
+        if sampai != sejak:
+            storage.simpan_kursor(kunci, sampai)
+            sejak = sampai
+        if len(records) < ukuran_batch:
+            break
+
+    kunci = f'tarik:{server}'
+    sejak = storage.kursor(kunci)
+    while True:
+        data = _minta(f'{server}/sinkron/tarik?sejak={sejak}&batas={ukuran_batch}&kecuali={storage.instansi}',
+                      token, batas_waktu=batas_waktu)
+        batch = buka(data)
+        ringkasan['byte_terima'] += len(data)
+        disimpan, duplikat = storage.simpan_sinkron(batch['records'], batch['asal'])
+        ringkasan['diterima'] += disimpan
+        ringkasan['duplikat'] += duplikat
+        if batch['sampai'] != sejak:
+            storage.simpan_kursor(kunci, batch['sampai'])
+            sejak = batch['sampai']
+        if len(batch['records']) < ukuran_batch:
+            break
+
+    ringkasan['detik'] = round(time.perf_counter() - mulai, 3)
+    return ringkasan
+
+
+def buat_server_pusat(storage, token=None):
+    # Server pusat minimal: hanya endpoint sinkronisasi, tanpa model fuzzy.
+    app = Flask(__name__)
+    app.register_blueprint(buat_api_sinkron(storage, token or token_sinkron()), url_prefix='/sinkron')
+    return app
+
+
+def _records_uji(model, posyandu, n, seed, tanggal):
+    from batch import populasi_sintetis
+    from inferensi import klasifikasi_batch
+
+    pop = populasi_sintetis(n, model.referensi, seed=seed)
+    hasil = model.inferensi_batch(pop['gender'].to_numpy(), pop['umur'].to_numpy(),
+                                  pop['tinggi'].to_numpy(), pop['berat'].to_numpy())
+    kesimpulan, warna = klasifikasi_batch(hasil['skor'])
+    return [{'Tanggal': tanggal, 'nama': f'{posyandu}-{r.nama}', 'JK': r.gender, 'Umur_Bulan': float(r.umur),
+             'Tinggi_cm': float(r.tinggi), 'Berat_kg': float(r.berat), 'Z_Score_TB': round(float(hasil['z_tb'][i]), 2),
+             'Z_Score_BB': round(float(hasil['z_bb'][i]), 2), 'Skor_Fuzzy': round(float(hasil['skor'][i]), 2),
+             'Kesimpulan': str(kesimpulan[i]), 'warna': str(warna[i])}
+            for i, r in enumerate(pop.itertuples(index=False))]
+
+
+def uji_sinkron(jumlah=5000, tambahan=50, ukuran_batch=UKURAN_BATCH):
+    # Dua instansi lokal + server pusat di thread (port acak), masing-masing
+    # dengan database SQLite sementara. Mengembalikan jumlah pemeriksaan
+    # yang gagal.
+    import logging
+    from werkzeug.serving import make_server
+    from inferensi import model_bersama
+    from storage import SQLiteStorage
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    direktori = tempfile.mkdtemp(prefix='uji-sinkron-')
+    pusat = SQLiteStorage(f'sqlite:///{direktori}/pusat.db')
+    token = secrets.token_hex(16)
+    server = make_server('127.0.0.1', 0, buat_server_pusat(pusat, token), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    a = SQLiteStorage(f'sqlite:///{direktori}/posyandu_a.db')
+    b = SQLiteStorage(f'sqlite:///{direktori}/posyandu_b.db')
+    model = model_bersama()
+    gagal = 0
+
+    def cek(syarat, pesan):
+        nonlocal gagal
+        if not syarat:
+            gagal += 1
+        print(f"  [{'OK' if syarat else 'GAGAL'}] {pesan}")
+
+    def uid(storage):
+        return {r['uid'] for blok in storage.iter_blok() for r in blok}
+
+    def tahap(judul, daftar):
+        print(judul)
+        hasil = {}
+        for nama, storage in daftar:
+            r = hasil[nama] = sinkronkan(storage, url, ukuran_batch, token=token)
+            print(f"  {nama}: kirim {r['dikirim']} ({r['byte_kirim']} B), terima {r['diterima']} "
+                  f"({r['byte_terima']} B), duplikat {r['duplikat'] + r['ditolak_server']}, {r['detik']} detik")
+        return hasil
+
+    try:
+        for salah in ('', 'bukan-token'):
+            try:
+                sinkronkan(a, url, ukuran_batch, token=salah)
+                ditolak = False
+            except urllib.error.HTTPError as e:
+                ditolak = e.code == 401
+            cek(ditolak and pusat.jumlah() == 0, f"permintaan dengan token {salah or 'kosong'!r} ditolak (401)")
+
+        a.simpan_banyak(_records_uji(model, 'A', jumlah, 1, '2025-01-10 09:00'))
+        b.simpan_banyak(_records_uji(model, 'B', jumlah, 2, '2025-01-11 09:00'))
+        # Pemeriksaan yang sama tercatat di kedua posyandu (uid berbeda).
+        kembar = _records_uji(model, 'K', 10, 3, '2025-01-12 09:00')
+        a.simpan_banyak(kembar)
+        b.simpan_banyak(kembar)
+
+        hasil = tahap("Sinkron pertama", [('A', a), ('B', b), ('A', a)])
+        total = 2 * jumlah + 10
+        cek(pusat.jumlah() == a.jumlah() == b.jumlah() == total,
+            f"pusat/A/B berisi {pusat.jumlah()}/{a.jumlah()}/{b.jumlah()} pemeriksaan, harus {total}")
+        cek(uid(a) == uid(pusat) and len(uid(b) ^ uid(pusat)) == 20,
+            "uid A sama dengan pusat; B hanya berbeda pada 10 pemeriksaan kembar")
+
+        hasil = tahap("Sinkron ulang tanpa data baru", [('A', a), ('B', b)])
+        cek(all(r['dikirim'] == r['diterima'] == 0 and r['byte_kirim'] == 0 for r in hasil.values()),
+            "tidak ada pemeriksaan yang dikirim atau diterima ulang")
+
+        a.simpan_banyak(_records_uji(model, 'A', tambahan, 4, '2025-02-10 09:00'))
+        hasil = tahap(f"{tambahan} pemeriksaan baru di A", [('A', a), ('B', b)])
+        cek(hasil['A']['dikirim'] == hasil['B']['diterima'] == tambahan, f"delta {tambahan} sampai di B")
+        cek(hasil['A']['byte_kirim'] < 2 * tambahan * 100,
+            f"ukuran delta {hasil['A']['byte_kirim']} B (~{hasil['A']['byte_kirim'] // tambahan} B per pemeriksaan)")
+
+        # Jawaban server hilang: A mengirim ulang semua batch dari awal.
+        a.simpan_kursor(f'dorong:{url}', 0)
+        hasil = tahap("Kirim ulang seluruh log A (idempoten)", [('A', a)])
+        cek(hasil['A']['dikirim'] == 0 and pusat.jumlah() == total + tambahan,
+            f"pusat tetap {pusat.jumlah()} pemeriksaan, {hasil['A']['ditolak_server']} duplikat dilewati")
+    finally:
+        server.shutdown()
+        for storage in (pusat, a, b):
+            storage.engine.dispose()
+        shutil.rmtree(direktori, ignore_errors=True)
+    print("LULUS" if not gagal else f"{gagal} pemeriksaan GAGAL")
+    return gagal
+
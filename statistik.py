@@ -0,0 +1,108 @@
+import math
+
+# Kelompok umur (bulan): label -> [batas bawah, batas atas).
+KELOMPOK_UMUR = {
+    '0-5': (0, 6),
+    '6-11': (6, 12),
+    '12-23': (12, 24),
+    '24-35': (24, 36),
+    '36-47': (36, 48),
+    '48-60': (48, 61),
+}
+
+KATEGORI = {
+    'Normal': 'n_normal',
+    'Stunted (Stunting)': 'n_stunted',
+    'Severely Stunted (Stunting Berat)': 'n_severely_stunted',
+}
+
+# Batas WHO: < -2 SD (pendek / gizi kurang), < -3 SD (sangat pendek / gizi buruk).
+AMBANG_Z = {
+    'n_stunting': ('z_score_tb', -2),
+    'n_stunting_berat': ('z_score_tb', -3),
+    'n_underweight': ('z_score_bb', -2),
+    'n_underweight_berat': ('z_score_bb', -3),
+}
+
+KOLOM_HITUNG = ['n'] + list(KATEGORI.values()) + list(AMBANG_Z)
+KOLOM_Z = {'z_score_tb': 'z_tb', 'z_score_bb': 'z_bb'}
+
+
+def label_umur(umur):
+    if umur is None:
+        return '-'
+    for label, (bawah, atas) in KELOMPOK_UMUR.items():
+        if bawah <= umur < atas:
+            return label
+    return '-'
+
+
+def kunci(baris):
+    return (str(baris['tanggal'])[:7], baris['jk'] or '-', label_umur(baris['umur_bulan']))
+
+
+def agregat_kosong(periode, jk, kelompok_umur):
+    agregat = {'periode': periode, 'jk': jk, 'kelompok_umur': kelompok_umur}
+    agregat.update({k: 0 for k in KOLOM_HITUNG})
+    for z in KOLOM_Z.values():
+        agregat.update({f'n_{z}': 0, f'rata_{z}': 0.0, f'm2_{z}': 0.0})
+    return agregat
+
+
+def tambah(agregat, baris):
+    # Satu pemeriksaan; rata-rata dan varians diperbarui dengan Welford.
+    agregat['n'] += 1
+    if baris['kesimpulan'] in KATEGORI:
+        agregat[KATEGORI[baris['kesimpulan']]] += 1
+    for kolom, (sumber, batas) in AMBANG_Z.items():
+        if baris[sumber] is not None and baris[sumber] < batas:
+            agregat[kolom] += 1
+    for sumber, z in KOLOM_Z.items():
+        nilai = baris[sumber]
+        if nilai is None:
+            continue
+        agregat[f'n_{z}'] += 1
+        delta = nilai - agregat[f'rata_{z}']
+        agregat[f'rata_{z}'] += delta / agregat[f'n_{z}']
+        agregat[f'm2_{z}'] += delta * (nilai - agregat[f'rata_{z}'])
+    return agregat
+
+
+def gabung(a, b):
+    # Menggabungkan dua agregat (rumus paralel Chan) tanpa membaca data mentah.
+    hasil = dict(a)
+    for kolom in KOLOM_HITUNG:
+        hasil[kolom] = a[kolom] + b[kolom]
+    for z in KOLOM_Z.values():
+        na, nb = a[f'n_{z}'], b[f'n_{z}']
+        n = na + nb
+        if n == 0:
+            continue
+        delta = b[f'rata_{z}'] - a[f'rata_{z}']
+        hasil[f'n_{z}'] = n
+        hasil[f'rata_{z}'] = a[f'rata_{z}'] + delta * nb / n
+        hasil[f'm2_{z}'] = a[f'm2_{z}'] + b[f'm2_{z}'] + delta ** 2 * na * nb / n
+    return hasil
+
+
+def ringkas(agregat):
+    n = agregat['n']
+    ringkasan = {k: agregat[k] for k in KOLOM_HITUNG}
+    for kolom in KOLOM_HITUNG[1:]:
+        ringkasan['persen_' + kolom[2:]] = round(100.0 * agregat[kolom] / n, 1) if n else None
+    for z in KOLOM_Z.values():
+        nz = agregat[f'n_{z}']
+        ringkasan[f'rata_{z}'] = round(agregat[f'rata_{z}'], 2) if nz else None
+        ringkasan[f'sd_{z}'] = round(math.sqrt(agregat[f'm2_{z}'] / (nz - 1)), 2) if nz > 1 else None
+    return ringkasan
+
+
+def kelompokkan(daftar_agregat, dimensi):
+    # dimensi: 'periode', 'jk' atau 'kelompok_umur'. Urutan kunci mengikuti
+    # urutan alami (periode naik, kelompok umur sesuai KELOMPOK_UMUR).
+    hasil = {}
+    for agregat in daftar_agregat:
+        k = agregat[dimensi]
+        hasil[k] = gabung(hasil[k], agregat) if k in hasil else dict(agregat)
+    urutan = list(KELOMPOK_UMUR) + ['-'] if dimensi == 'kelompok_umur' else sorted(hasil)
+    return [(k, ringkas(hasil[k])) for k in urutan if k in hasil]
@@ -0,0 +1,688 @@
+import os
+import re
+import uuid
+import numpy as np
+from sqlalchemy import (Boolean, Column, Float, Index, Integer, MetaData, String, Table,
+                        bindparam, create_engine, event, func, insert, inspect, select, text, tuple_)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from growth import buat_id_anak, perbarui_metrik
+import statistik
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+PATH_CSV = 'dataset/laporan_hasil.csv'
+URL_DB = 'sqlite:///dataset/laporan_hasil.db'
+
+# Kolom laporan (urutan header laporan_hasil.csv) -> kolom tabel.
+KOLOM = {
+    'Tanggal': 'tanggal',
+    'nama': 'nama',
+    'JK': 'jk',
+    'Umur_Display': 'umur_display',
+    'Umur_Bulan': 'umur_bulan',
+    'Tinggi_cm': 'tinggi_cm',
+    'Berat_kg': 'berat_kg',
+    'Z_Score_TB': 'z_score_tb',
+    'Z_Score_BB': 'z_score_bb',
+    'Skor_Fuzzy': 'skor_fuzzy',
+    'Kesimpulan': 'kesimpulan',
+    'warna': 'warna',
+    'id_anak': 'id_anak',
+    'uid': 'uid',
+}
+KOLOM_CSV = ['Tanggal', 'nama', 'JK', 'Umur_Display', 'Tinggi_cm', 'Berat_kg',
+             'Z_Score_TB', 'Z_Score_BB', 'Skor_Fuzzy', 'Kesimpulan', 'warna', 'Umur_Bulan', 'id_anak']
+
+metadata = MetaData()
+
+pemeriksaan = Table(
+    'pemeriksaan', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('tanggal', String(19), nullable=False),
+    Column('nama', String(200), nullable=False),
+    Column('jk', String(20)),
+    Column('umur_display', String(60)),
+    Column('umur_bulan', Float),
+    Column('tinggi_cm', Float),
+    Column('berat_kg', Float),
+    Column('z_score_tb', Float),
+    Column('z_score_bb', Float),
+    Column('skor_fuzzy', Float),
+    Column('kesimpulan', String(60)),
+    Column('warna', String(20)),
+    Column('id_anak', String(200)),
+    Column('uid', String(32)),
+    # (tanggal, id) untuk halaman /database; di SQLite indeks lama pada
+    # tanggal saja sudah setara karena setiap indeks menyertakan rowid (= id).
+    Index('ix_pemeriksaan_tanggal', 'tanggal', 'id'),
+    Index('ix_pemeriksaan_nama', 'nama'),
+    Index('ix_pemeriksaan_kesimpulan', 'kesimpulan'),
+    Index('ix_pemeriksaan_jk', 'jk'),
+    Index('ix_pemeriksaan_id_anak', 'id_anak'),
+    Index('ix_pemeriksaan_uid', 'uid', unique=True),
+)
+
+# Log perubahan append-only untuk sinkronisasi: satu baris per pemeriksaan
+# yang masuk (dibuat di sini atau diterima dari instansi lain), urut seq.
+log_perubahan = Table(
+    'log_perubahan', metadata,
+    Column('seq', Integer, primary_key=True, autoincrement=True),
+    Column('uid', String(32), nullable=False),
+    Column('asal', String(32), nullable=False),
+)
+
+# Identitas instansi dan kursor sinkronisasi per server.
+meta_sinkron = Table(
+    'meta_sinkron', metadata,
+    Column('kunci', String(200), primary_key=True),
+    Column('nilai', String(200), nullable=False),
+)
+
+# Status pertumbuhan terkini per anak, diperbarui setiap kali ada kunjungan.
+anak = Table(
+    'anak', metadata,
+    Column('id_anak', String(200), primary_key=True),
+    Column('nama', String(200)),
+    Column('jk', String(20)),
+    Column('jumlah_kunjungan', Integer, nullable=False),
+    Column('tanggal_terakhir', String(19)),
+    Column('umur_terakhir', Float),
+    Column('z_tb_terakhir', Float),
+    Column('z_bb_terakhir', Float),
+    Column('kesimpulan_terakhir', String(60)),
+    Column('selang_bulan', Float),
+    Column('kecepatan_z_tb', Float),
+    Column('kecepatan_z_bb', Float),
+    Column('transisi', String(130)),
+    Column('faltering', Boolean, nullable=False, default=False),
+    Index('ix_anak_faltering', 'faltering', 'tanggal_terakhir'),
+)
+
+# Agregat berjalan per (bulan, jenis kelamin, kelompok umur) untuk dashboard
+# prevalensi; diperbarui setiap kali pemeriksaan disimpan.
+tabel_statistik = Table(
+    'statistik', metadata,
+    Column('periode', String(7), primary_key=True),
+    Column('jk', String(20), primary_key=True),
+    Column('kelompok_umur', String(10), primary_key=True),
+    *[Column(k, Integer, nullable=False, default=0) for k in statistik.KOLOM_HITUNG],
+    *[Column(f'{p}_{z}', Integer if p == 'n' else Float, nullable=False, default=0)
+      for z in statistik.KOLOM_Z.values() for p in ('n', 'rata', 'm2')],
+)
+
+UKURAN_HALAMAN = 50
+
+
+
+def _umur_bulan(record):
+    if record.get('Umur_Bulan') is not None:
+        return float(record['Umur_Bulan'])
+    cocok = re.search(r'([\d.]+) Bulan', str(record.get('Umur_Display', '')))
+    return float(cocok.group(1)) if cocok else None
+
+
+def normalisasi(record):
+    # Terima format main.py (Tanggal_Periksa, Umur_Bulan) maupun app.py.
+    record = dict(record)
+    if 'Tanggal' not in record and 'Tanggal_Periksa' in record:
+        record['Tanggal'] = record['Tanggal_Periksa']
+    record['Umur_Bulan'] = _umur_bulan(record)
+    if not record.get('Umur_Display') and record['Umur_Bulan'] is not None:
+        record['Umur_Display'] = f"{record['Umur_Bulan']} Bulan"
+    record['id_anak'] = buat_id_anak(record.get('nama'), record.get('JK'), record.get('id_anak'))
+    baris = {}
+    for kunci, kolom in KOLOM.items():
+        nilai = record.get(kunci)
+        if isinstance(nilai, float) and np.isnan(nilai):
+            nilai = None
+        elif isinstance(nilai, np.generic):
+            nilai = nilai.item()
+        baris[kolom] = nilai
+    # ID global pemeriksaan; tetap sama saat dikirim ke instansi lain.
+    baris['uid'] = baris['uid'] or uuid.uuid4().hex
+    return baris
+
+
+def kunci_duplikat(tanggal, id_anak, tinggi, berat):
+    # Pemeriksaan yang sama: anak, waktu dan ukuran identik.
+    def bulat(x):
+        return None if x is None or x != x else round(float(x), 2)
+    return (str(tanggal).strip(), id_anak, bulat(tinggi), bulat(berat))
+
+
+def _ke_record(baris):
+    record = {kunci: baris[kolom] for kunci, kolom in KOLOM.items()}
+    if 'id' in baris:
+        record['id'] = baris['id']
+    return record
+
+
+# Backend lama (laporan_hasil.csv) untuk baca/tulis laporan. Tidak punya
+# indeks, uid tetap, maupun log perubahan: impor dan sinkronisasi hanya
+# tersedia pada SQLite (lihat `python main.py migrasi`).
+class CSVStorage:
+    def __init__(self, path=PATH_CSV):
+        self.path = path
+        self._migrasi_kolom()
+
+    def _migrasi_kolom(self, ukuran_blok=5000):
+        # CSV lama belum punya Umur_Bulan dan id_anak: tulis ulang sekali
+        # dengan nilai yang diturunkan dari Umur_Display dan nama + JK.
+        import pandas as pd
+
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            header = f.readline().strip()
+        if not header or header.split(',') == KOLOM_CSV:
+            return
+        sementara = self.path + '.baru'
+        pd.DataFrame(columns=KOLOM_CSV).to_csv(sementara, index=False)
+        for potong in pd.read_csv(self.path, chunksize=ukuran_blok, dtype={'id_anak': str}):
+            df = pd.DataFrame([_ke_record(normalisasi(r)) for r in potong.to_dict(orient='records')],
+                              columns=KOLOM_CSV)
+            df.to_csv(sementara, mode='a', header=False, index=False)
+        os.replace(sementara, self.path)
+
+    def simpan(self, record):
+        self.simpan_banyak([record])
+
+    def simpan_banyak(self, records):
+        import pandas as pd
+
+        df = pd.DataFrame([_ke_record(normalisasi(r)) for r in records], columns=KOLOM_CSV)
+        with open(self.path, 'a', newline='') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                df.to_csv(f, header=f.tell() == 0, index=False)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return len(df)
+
+    def semua(self):
+        import pandas as pd
+
+        if not os.path.exists(self.path):
+            return []
+        df = pd.read_csv(self.path, dtype={'id_anak': str})
+        return df.iloc[::-1].replace({np.nan: None}).to_dict(orient='records')
+
+    def halaman(self, batas=UKURAN_HALAMAN, sebelum=None, kesimpulan=None, jk=None,
+                umur_min=None, umur_max=None, dari=None, sampai=None, cari=None):
+        # CSV tidak punya indeks: filter dan urutan (tanggal, id) dilakukan di
+        # memori, id = nomor baris.
+        import pandas as pd
+
+        if not os.path.exists(self.path):
+            return [], None
+        df = pd.read_csv(self.path, dtype={'id_anak': str})
+        df['id'] = np.arange(1, len(df) + 1)
+        df['Umur_Bulan'] = [_umur_bulan(r) for r in df.to_dict(orient='records')]
+        umur = pd.to_numeric(df['Umur_Bulan'], errors='coerce')
+        tanggal = df['Tanggal'].astype(str)
+        mask = pd.Series(True, index=df.index)
+        if sebelum is not None:
+            mask &= (tanggal < sebelum[0]) | ((tanggal == sebelum[0]) & (df['id'] < sebelum[1]))
+        if kesimpulan:
+            mask &= df['Kesimpulan'] == kesimpulan
+        if jk:
+            mask &= df['JK'] == jk
+        if umur_min is not None:
+            mask &= umur >= umur_min
+        if umur_max is not None:
+            mask &= umur < umur_max
+        if dari:
+            mask &= tanggal >= dari
+        if sampai:
+            mask &= tanggal <= sampai + ' 23:59:59'
+        if cari:
+            mask &= df['nama'].astype(str).str.startswith(cari)
+        hasil = (df[mask].assign(Tanggal=tanggal[mask]).sort_values(['Tanggal', 'id'], ascending=False)
+                 .head(batas + 1).replace({np.nan: None}).to_dict(orient='records'))
+        lanjut = (hasil[batas - 1]['Tanggal'], hasil[batas - 1]['id']) if len(hasil) > batas else None
+        return hasil[:batas], lanjut
+
+    def jumlah(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            return max(sum(1 for _ in f) - 1, 0)
+
+    def _baris(self, ukuran_blok=5000):
+        # Satu kali lewat file per potongan; id = nomor baris.
+        import pandas as pd
+
+        if not os.path.exists(self.path):
+            return
+        nomor = 0
+        for potong in pd.read_csv(self.path, chunksize=ukuran_blok, dtype={'id_anak': str}):
+            for record in potong.to_dict(orient='records'):
+                nomor += 1
+                baris = normalisasi(record)
+                baris['id'] = nomor
+                yield baris
+
+    def iter_blok(self, ukuran_blok=5000, dari=None, sampai=None, kesimpulan=None):
+        blok = []
+        for baris in self._baris(ukuran_blok):
+            record = _ke_record(baris)
+            tanggal = str(record['Tanggal'])
+            if ((dari and tanggal < dari) or (sampai and tanggal > sampai + ' 23:59:59')
+                    or (kesimpulan and record['Kesimpulan'] != kesimpulan)):
+                continue
+            blok.append(record)
+            if len(blok) == ukuran_blok:
+                yield blok
+                blok = []
+        if blok:
+            yield blok
+
+    def tupel_terbanyak(self, batas=10000):
+        from collections import Counter
+
+        hitung = Counter((r['JK'], r['Umur_Bulan'], r['Tinggi_cm'], r['Berat_kg'])
+                         for blok in self.iter_blok() for r in blok)
+        return [t for t, _ in hitung.most_common(batas) if None not in t]
+
+    def kunci_tersimpan(self, daftar_id_anak):
+        # CSV tidak punya indeks: seluruh file dipindai per blok.
+        ids = set(daftar_id_anak)
+        return {kunci_duplikat(r['Tanggal'], r['id_anak'], r['Tinggi_cm'], r['Berat_kg'])
+                for blok in self.iter_blok() for r in blok if r['id_anak'] in ids}
+
+
+    # Riwayat pertumbuhan dan statistik dihitung ulang dengan satu kali lewat
+    # file per permintaan (tanpa tabel anak/statistik seperti SQLite).
+    def status_anak(self, id_anak):
+        status = None
+        for baris in self._baris():
+            if baris['id_anak'] == id_anak:
+                status = perbarui_metrik(status, baris)
+        return status
+
+    def riwayat_anak(self, id_anak):
+        return [_ke_record(b) for b in self._baris() if b['id_anak'] == id_anak]
+
+    def anak_faltering(self, batas=UKURAN_HALAMAN):
+        status = {}
+        for baris in self._baris():
+            status[baris['id_anak']] = perbarui_metrik(status.get(baris['id_anak']), baris)
+        daftar = [s for s in status.values() if s['faltering']]
+        daftar.sort(key=lambda s: str(s['tanggal_terakhir']), reverse=True)
+        return daftar[:batas]
+
+    def statistik(self, periode=None):
+        agregat = {}
+        for baris in self._baris():
+            k = statistik.kunci(baris)
+            if periode and k[0] != periode:
+                continue
+            if k not in agregat:
+                agregat[k] = statistik.agregat_kosong(*k)
+            statistik.tambah(agregat[k], baris)
+        return list(agregat.values())
+
+
+class SQLiteStorage:
+    def __init__(self, url=URL_DB):
+        self.engine = create_engine(url, future=True, connect_args={'timeout': 30})
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', self._pragma)
+        statistik_baru = not inspect(self.engine).has_table('statistik')
+        log_baru = not inspect(self.engine).has_table('log_perubahan')
+        metadata.create_all(self.engine)
+        self.instansi = self._instansi()
+        kolom = {k['name'] for k in inspect(self.engine).get_columns('pemeriksaan')}
+        for nama, tipe in (('id_anak', 'VARCHAR(200)'), ('uid', 'VARCHAR(32)')):
+            if nama not in kolom:
+                with self.engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE pemeriksaan ADD COLUMN {nama} {tipe}'))
+        if statistik_baru and self.jumlah() > 0:
+            self.bangun_ulang_statistik()
+        if 'id_anak' not in kolom:
+            self.bangun_ulang_pertumbuhan()
+        if log_baru and self.jumlah() > 0:
+            self._isi_log_lama()
+        for indeks in pemeriksaan.indexes:
+            indeks.create(self.engine, checkfirst=True)
+
+    @staticmethod
+    def _pragma(dbapi_conn, _):
+        # WAL: pembaca tidak memblokir penulis dari worker lain.
+        cur = dbapi_conn.cursor()
+        cur.execute('PRAGMA journal_mode=WAL')
+        cur.execute('PRAGMA synchronous=NORMAL')
+        cur.close()
+
+    def _instansi(self):
+        with self.engine.begin() as conn:
+            nilai = conn.execute(select(meta_sinkron.c.nilai).where(meta_sinkron.c.kunci == 'instansi')).scalar()
+            if nilai is None:
+                nilai = uuid.uuid4().hex
+                conn.execute(insert(meta_sinkron), [{'kunci': 'instansi', 'nilai': nilai}])
+        return nilai
+
+    def _isi_log_lama(self, ukuran_blok=5000):
+        # Database lama: beri uid pada pemeriksaan yang belum punya dan catat
+        # seluruh riwayat ke log (urut id) sebagai milik instansi ini.
+        with self.engine.begin() as conn:
+            terakhir = 0
+            while True:
+                query = (select(pemeriksaan.c.id, pemeriksaan.c.uid).where(pemeriksaan.c.id > terakhir)
+                         .order_by(pemeriksaan.c.id).limit(ukuran_blok))
+                blok = conn.execute(query).all()
+                if not blok:
+                    break
+                uid = {i: u or uuid.uuid4().hex for i, u in blok}
+                kosong = [{'_id': i, '_uid': uid[i]} for i, u in blok if not u]
+                if kosong:
+                    conn.execute(pemeriksaan.update()
+                                 .where(pemeriksaan.c.id == bindparam('_id'))
+                                 .values(uid=bindparam('_uid')), kosong)
+                conn.execute(insert(log_perubahan), [{'uid': uid[i], 'asal': self.instansi} for i, _ in blok])
+                terakhir = blok[-1][0]
+
+    def _tulis(self, conn, daftar_baris, asal=None):
+        conn.execute(insert(pemeriksaan), daftar_baris)
+        conn.execute(insert(log_perubahan), [{'uid': b['uid'], 'asal': asal or self.instansi} for b in daftar_baris])
+        self._perbarui_statistik(conn, daftar_baris)
+        return self._perbarui_pertumbuhan(conn, daftar_baris)
+
+    def simpan(self, record):
+        baris = normalisasi(record)
+        with self.engine.begin() as conn:
+            return self._tulis(conn, [baris])[baris['id_anak']]
+
+    def simpan_banyak(self, records):
+        baris = [normalisasi(r) for r in records]
+        if baris:
+            with self.engine.begin() as conn:
+                self._tulis(conn, baris)
+        return len(baris)
+
+    def simpan_sinkron(self, records, asal):
+        # Terima pemeriksaan dari instansi lain. Idempoten: uid yang sudah ada,
+        # atau pemeriksaan yang sama (kunci_duplikat) dengan uid lain, dilewati.
+        # Mengembalikan (jumlah disimpan, jumlah duplikat).
+        baris = [normalisasi(r) for r in records]
+        if not baris:
+            return 0, 0
+        c = pemeriksaan.c
+        with self.engine.begin() as conn:
+            uid_ada, kunci_ada = set(), set()
+            uids = [b['uid'] for b in baris]
+            ids = list({b['id_anak'] for b in baris})
+            for i in range(0, len(uids), 500):
+                uid_ada.update(conn.execute(select(c.uid).where(c.uid.in_(uids[i:i + 500]))).scalars())
+            for i in range(0, len(ids), 500):
+                query = select(c.tanggal, c.id_anak, c.tinggi_cm, c.berat_kg).where(c.id_anak.in_(ids[i:i + 500]))
+                kunci_ada.update(kunci_duplikat(*b) for b in conn.execute(query))
+            baru = []
+            for b in baris:
+                kunci = kunci_duplikat(b['tanggal'], b['id_anak'], b['tinggi_cm'], b['berat_kg'])
+                if b['uid'] in uid_ada or kunci in kunci_ada:
+                    continue
+                uid_ada.add(b['uid'])
+                kunci_ada.add(kunci)
+                baru.append(b)
+            if baru:
+                self._tulis(conn, sorted(baru, key=lambda b: b['tanggal']), asal)
+        return len(baru), len(baris) - len(baru)
+
+    def log_sejak(self, sejak=0, batas=1000, asal=None, kecuali=None):
+        # Pemeriksaan di log dengan seq > sejak, urut seq. Mengembalikan
+        # (records, seq terakhir yang sudah diperiksa); baris yang tersaring
+        # asal/kecuali tetap dilewati kursor agar tidak dipindai ulang.
+        l, c = log_perubahan.c, pemeriksaan.c
+        with self.engine.connect() as conn:
+            puncak = conn.execute(select(func.max(l.seq))).scalar() or 0
+            query = (select(l.seq, pemeriksaan).join(pemeriksaan, c.uid == l.uid)
+                     .where(l.seq > sejak, l.seq <= puncak).order_by(l.seq).limit(batas))
+            if asal is not None:
+                query = query.where(l.asal == asal)
+            if kecuali is not None:
+                query = query.where(l.asal != kecuali)
+            hasil = conn.execute(query).mappings().all()
+        records = [_ke_record(b) for b in hasil]
+        sampai = hasil[-1]['seq'] if len(hasil) == batas else max(puncak, sejak)
+        return records, sampai
+
+    def kursor(self, kunci, bawaan=0):
+        with self.engine.connect() as conn:
+            nilai = conn.execute(select(meta_sinkron.c.nilai).where(meta_sinkron.c.kunci == kunci)).scalar()
+        return int(nilai) if nilai is not None else bawaan
+
+    def simpan_kursor(self, kunci, nilai):
+        stmt = sqlite_insert(meta_sinkron).values(kunci=kunci, nilai=str(nilai))
+        with self.engine.begin() as conn:
+            conn.execute(stmt.on_conflict_do_update(index_elements=[meta_sinkron.c.kunci],
+                                                    set_={'nilai': stmt.excluded.nilai}))
+
+    def _perbarui_pertumbuhan(self, conn, daftar_baris):
+        # Dipanggil setelah insert, di dalam transaksi yang sama: kunci tulis
+        # SQLite sudah dipegang sehingga status anak tidak bisa balapan.
+        ids = list(dict.fromkeys(b['id_anak'] for b in daftar_baris))
+        status = {}
+        for awal in range(0, len(ids), 500):
+            query = select(anak).where(anak.c.id_anak.in_(ids[awal:awal + 500]))
+            status.update({s['id_anak']: dict(s) for s in conn.execute(query).mappings()})
+        for baris in daftar_baris:
+            status[baris['id_anak']] = perbarui_metrik(status.get(baris['id_anak']), baris)
+
+        perubahan = [status[i] for i in ids]
+        stmt = sqlite_insert(anak)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[anak.c.id_anak],
+            set_={k: stmt.excluded[k] for k in perubahan[0] if k != 'id_anak'})
+        conn.execute(stmt, perubahan)
+        return status
+
+    def _perbarui_statistik(self, conn, daftar_baris):
+        baru = {}
+        for baris in daftar_baris:
+            k = statistik.kunci(baris)
+            if k not in baru:
+                baru[k] = statistik.agregat_kosong(*k)
+            statistik.tambah(baru[k], baris)
+
+        c = tabel_statistik.c
+        gabungan = []
+        for k, agregat in baru.items():
+            lama = conn.execute(select(tabel_statistik).where(
+                c.periode == k[0], c.jk == k[1], c.kelompok_umur == k[2])).mappings().first()
+            gabungan.append(statistik.gabung(dict(lama), agregat) if lama else agregat)
+
+        stmt = sqlite_insert(tabel_statistik)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.periode, c.jk, c.kelompok_umur],
+            set_={k: stmt.excluded[k] for k in gabungan[0] if k not in ('periode', 'jk', 'kelompok_umur')})
+        conn.execute(stmt, gabungan)
+
+    def bangun_ulang_statistik(self, ukuran_blok=5000):
+        # Satu kali lewat seluruh riwayat secara bertahap (per blok id).
+        with self.engine.begin() as conn:
+            conn.execute(tabel_statistik.delete())
+            agregat = {}
+            terakhir = 0
+            while True:
+                query = (select(pemeriksaan).where(pemeriksaan.c.id > terakhir)
+                         .order_by(pemeriksaan.c.id).limit(ukuran_blok))
+                blok = conn.execute(query).mappings().all()
+                if not blok:
+                    break
+                for baris in blok:
+                    k = statistik.kunci(baris)
+                    if k not in agregat:
+                        agregat[k] = statistik.agregat_kosong(*k)
+                    statistik.tambah(agregat[k], baris)
+                terakhir = blok[-1]['id']
+            if agregat:
+                conn.execute(insert(tabel_statistik), list(agregat.values()))
+        return len(agregat)
+
+    def statistik(self, periode=None):
+        query = select(tabel_statistik)
+        if periode:
+            query = query.where(tabel_statistik.c.periode == periode)
+        with self.engine.connect() as conn:
+            return [dict(b) for b in conn.execute(query).mappings()]
+
+    def bangun_ulang_pertumbuhan(self, ukuran_blok=5000):
+        # Satu kali lewat seluruh riwayat (urut id) untuk mengisi id_anak yang
+        # kosong dan menyusun ulang tabel anak.
+        with self.engine.begin() as conn:
+            conn.execute(anak.delete())
+            status = {}
+            terakhir = 0
+            while True:
+                query = (select(pemeriksaan).where(pemeriksaan.c.id > terakhir)
+                         .order_by(pemeriksaan.c.id).limit(ukuran_blok))
+                blok = [dict(b) for b in conn.execute(query).mappings()]
+                if not blok:
+                    break
+                kosong = []
+                for baris in blok:
+                    if not baris['id_anak']:
+                        baris['id_anak'] = buat_id_anak(baris['nama'], baris['jk'])
+                        kosong.append({'_id': baris['id'], '_id_anak': baris['id_anak']})
+                    status[baris['id_anak']] = perbarui_metrik(status.get(baris['id_anak']), baris)
+                if kosong:
+                    conn.execute(pemeriksaan.update()
+                                 .where(pemeriksaan.c.id == bindparam('_id'))
+                                 .values(id_anak=bindparam('_id_anak')), kosong)
+                terakhir = blok[-1]['id']
+            if status:
+                conn.execute(insert(anak), list(status.values()))
+        return len(status)
+
+    def status_anak(self, id_anak):
+        with self.engine.connect() as conn:
+            hasil = conn.execute(select(anak).where(anak.c.id_anak == id_anak)).mappings().first()
+        return dict(hasil) if hasil else None
+
+    def riwayat_anak(self, id_anak):
+        query = select(pemeriksaan).where(pemeriksaan.c.id_anak == id_anak).order_by(pemeriksaan.c.id)
+        with self.engine.connect() as conn:
+            return [_ke_record(b) for b in conn.execute(query).mappings()]
+
+    def anak_faltering(self, batas=UKURAN_HALAMAN):
+        query = (select(anak).where(anak.c.faltering.is_(True))
+                 .order_by(anak.c.tanggal_terakhir.desc()).limit(batas))
+        with self.engine.connect() as conn:
+            return [dict(b) for b in conn.execute(query).mappings()]
+
+    def semua(self):
+        query = select(pemeriksaan).order_by(pemeriksaan.c.id.desc())
+        with self.engine.connect() as conn:
+            return [_ke_record(b) for b in conn.execute(query).mappings()]
+
+    @staticmethod
+    def _saring(query, kesimpulan=None, jk=None, umur_min=None, umur_max=None, dari=None, sampai=None,
+                cari=None):
+        c = pemeriksaan.c
+        if kesimpulan:
+            query = query.where(c.kesimpulan == kesimpulan)
+        if jk:
+            query = query.where(c.jk == jk)
+        if umur_min is not None:
+            query = query.where(c.umur_bulan >= umur_min)
+        if umur_max is not None:
+            query = query.where(c.umur_bulan < umur_max)
+        if dari:
+            query = query.where(c.tanggal >= dari)
+        if sampai:
+            query = query.where(c.tanggal <= sampai + ' 23:59:59')
+        if cari:
+            query = query.where(c.nama >= cari, c.nama < cari + '\uffff')
+        return query
+
+    def halaman(self, batas=UKURAN_HALAMAN, sebelum=None, kesimpulan=None, jk=None,
+                umur_min=None, umur_max=None, dari=None, sampai=None, cari=None):
+        # Keyset pagination: urut (tanggal, id) menurun sehingga data impor
+        # atau sinkron bertanggal lama tidak tampil sebagai yang terbaru.
+        # sebelum = (tanggal, id) baris terakhir halaman sebelumnya; tidak ada
+        # OFFSET yang memindai riwayat.
+        c = pemeriksaan.c
+        query = select(pemeriksaan).order_by(c.tanggal.desc(), c.id.desc()).limit(batas + 1)
+        if sebelum is not None:
+            query = query.where(tuple_(c.tanggal, c.id) < tuple_(*sebelum))
+        query = self._saring(query, kesimpulan, jk, umur_min, umur_max, dari, sampai, cari)
+        with self.engine.connect() as conn:
+            hasil = [_ke_record(b) for b in conn.execute(query).mappings()]
+        lanjut = (hasil[batas - 1]['Tanggal'], hasil[batas - 1]['id']) if len(hasil) > batas else None
+        return hasil[:batas], lanjut
+
+    def jumlah(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(pemeriksaan)).scalar_one()
+
+    def iter_blok(self, ukuran_blok=5000, dari=None, sampai=None, kesimpulan=None):
+        # Riwayat urut id naik, per blok; tiap blok query keyset tersendiri
+        # sehingga memori tetap konstan berapa pun panjang riwayatnya.
+        c = pemeriksaan.c
+        query = self._saring(select(pemeriksaan).order_by(c.id).limit(ukuran_blok),
+                             kesimpulan=kesimpulan, dari=dari, sampai=sampai)
+        terakhir = 0
+        while True:
+            with self.engine.connect() as conn:
+                blok = [_ke_record(b) for b in conn.execute(query.where(c.id > terakhir)).mappings()]
+            if not blok:
+                return
+            yield blok
+            terakhir = blok[-1]['id']
+
+    def tupel_terbanyak(self, batas=10000):
+        # (jk, umur, tinggi, berat) yang paling sering muncul, untuk mengisi
+        # cache asesmen saat startup.
+        c = pemeriksaan.c
+        kolom = (c.jk, c.umur_bulan, c.tinggi_cm, c.berat_kg)
+        query = (select(*kolom).where(*[k.isnot(None) for k in kolom]).group_by(*kolom)
+                 .order_by(func.count().desc()).limit(batas))
+        with self.engine.connect() as conn:
+            return [tuple(b) for b in conn.execute(query)]
+
+    def kunci_tersimpan(self, daftar_id_anak):
+        c = pemeriksaan.c
+        ids = list(set(daftar_id_anak))
+        hasil = set()
+        with self.engine.connect() as conn:
+            for i in range(0, len(ids), 500):
+                query = select(c.tanggal, c.id_anak, c.tinggi_cm, c.berat_kg).where(c.id_anak.in_(ids[i:i + 500]))
+                hasil.update(kunci_duplikat(*b) for b in conn.execute(query))
+        return hasil
+
+
+def buat_storage(sinkron=False):
+    jenis = os.environ.get('STUNTING_STORAGE', 'sqlite')
+    if jenis == 'csv':
+        if sinkron:
+            raise ValueError("Sinkronisasi membutuhkan penyimpanan SQLite; set STUNTING_STORAGE=sqlite "
+                             "lalu pindahkan data CSV dengan 'python main.py migrasi'")
+        return CSVStorage(os.environ.get('STUNTING_CSV', PATH_CSV))
+    if jenis == 'sqlite':
+        return SQLiteStorage(os.environ.get('STUNTING_DB_URL', URL_DB))
+    raise ValueError(f"Backend penyimpanan tidak dikenal: {jenis}")
+
+
+def migrasi_csv(storage, path=PATH_CSV, ukuran_blok=5000, paksa=False):
+    import pandas as pd
+
+    if not os.path.exists(path):
+        print(f"File {path} tidak ditemukan, tidak ada yang dimigrasi.")
+        return 0
+    if storage.jumlah() > 0 and not paksa:
+        print("Penyimpanan tujuan sudah berisi data; migrasi dibatalkan (gunakan --paksa).")
+        return 0
+
+    total = 0
+    for blok in pd.read_csv(path, chunksize=ukuran_blok, dtype={'id_anak': str}):
+        total += storage.simpan_banyak(blok.to_dict(orient='records'))
+    print(f"{total} data dari {path} dimigrasi.")
+    return total
+
@@ -0,0 +1,13 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Modul aplikasi memakai path relatif (dataset/...) dan membaca direktori
+# cache/antrian dari environment saat diimpor, jadi ini harus diatur sebelum
+# modul tes mengimpornya. Tes tidak menulis apa pun ke dataset/.
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_SEMENTARA = tempfile.mkdtemp(prefix='stunting-tes-')
+os.environ.setdefault('STUNTING_CACHE_DIR', os.path.join(_SEMENTARA, 'cache'))
+os.environ.setdefault('STUNTING_DIR_ANTRIAN', os.path.join(_SEMENTARA, 'antrian'))
+atexit.register(shutil.rmtree, _SEMENTARA, True)
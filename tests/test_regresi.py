@@ -0,0 +1,24 @@
+import pandas as pd
+import benchmark
+
+
+def test_regresi_compiled():
+    assert benchmark.cek_regresi('compiled') == 0
+
+
+def test_regresi_exact(tmp_path):
+    # Engine exact menjalankan skfuzzy per anak (~2,5 menit untuk seluruh
+    # golden output); setiap baris ke-25 sudah mencakup semua kelompok.
+    path = tmp_path / 'golden.csv'
+    pd.read_csv(benchmark.PATH_GOLDEN).iloc[::25].to_csv(path, index=False)
+    assert benchmark.cek_regresi('exact', path=str(path)) == 0
+
+
+def test_regresi_mendeteksi_perubahan(tmp_path):
+    golden = pd.read_csv(benchmark.PATH_GOLDEN).iloc[:200]
+    golden.loc[golden.index[:3], 'kesimpulan'] = 'Normal?'
+    golden.loc[golden.index[3], 'skor'] += 5
+    path = tmp_path / 'golden.csv'
+    golden.to_csv(path, index=False)
+    # Tiap baris yang diubah gagal di jalur per anak maupun batch.
+    assert benchmark.cek_regresi('compiled', path=str(path)) == 8
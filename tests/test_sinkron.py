@@ -0,0 +1,8 @@
+import sinkron
+
+
+def test_uji_sinkron():
+    # Dua posyandu + server pusat sementara: token salah ditolak, data
+    # tersebar lengkap tanpa duplikat, delta kecil, kirim ulang idempoten.
+    # Batch kecil agar setiap arah melewati beberapa batch.
+    assert sinkron.uji_sinkron(jumlah=500, tambahan=20, ukuran_batch=200) == 0
@@ -0,0 +1,9 @@
+import argparse
+import main
+
+
+def test_uji_beban_thread_dan_proses():
+    # Hasil inferensi paralel (thread dan proses fork) harus identik dengan
+    # hasil sekuensial, termasuk saat cache asesmen dipakai bersama.
+    args = argparse.Namespace(engine='compiled', jumlah=1000, thread=8, proses=2, seed=0)
+    assert main.uji_beban(args) == 0
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Tabel WHO yang dimuat: (indikator, gender) -> file CSV. Tabel baru (mis.
+# weight-for-length 'wfl' atau BMI-for-age 'bfa') cukup ditambahkan di sini;
+# kolom pertama dipakai sebagai sumbu (bulan atau panjang badan).
+TABEL_WHO = {
+    ('lhfa', 'laki-laki'): 'dataset/lhfa_boys_0-to-5-years_zscores.csv',
+    ('lhfa', 'perempuan'): 'dataset/lhfa_girls_0-to-5-years_zscores.csv',
+    ('wfa', 'laki-laki'):  'dataset/wfa_boys_0-to-5-years_zscores.csv',
+    ('wfa', 'perempuan'):  'dataset/wfa_girls_0-to-5-years_zscores.csv',
+}
+
+KOLOM = ['L', 'M', 'S', 'SD3neg', 'SD2neg', 'SD1neg', 'SD0', 'SD1', 'SD2', 'SD3']
+INDEKS_KOLOM = {nama: i for i, nama in enumerate(KOLOM)}
+
+
+def kunci_gender(gender):
+    return 'laki-laki' if str(gender).lower() == 'laki-laki' else 'perempuan'
+
+
+def mask_laki(gender):
+    # Versi array dari kunci_gender. Perbandingan langsung jauh lebih murah
+    # daripada np.char.lower; lower hanya dipakai bila ada penulisan lain.
+    laki = gender == 'laki-laki'
+    if not np.all(laki | (gender == 'perempuan')):
+        laki = np.char.lower(gender.astype(str)) == 'laki-laki'
+    return laki
+
+
+class WHOReference:
+    def __init__(self, tabel):
+        # tabel: (indikator, gender) -> (sumbu_awal, langkah, array[n, len(KOLOM)])
+        self.tabel = tabel
+
+    @classmethod
+    def muat(cls, daftar_tabel=None):
+        import pandas as pd
+
+        tabel = {}
+        for kunci, path in (daftar_tabel or TABEL_WHO).items():
+            df = pd.read_csv(path, sep=';', decimal=',')
+            df = df.loc[:, ~df.columns.str.startswith('Unnamed')].dropna(how='all')
+            sumbu = df.iloc[:, 0].to_numpy(dtype=float)
+            langkah = np.diff(sumbu)
+            if len(sumbu) < 2 or not np.allclose(langkah, langkah[0]):
+                raise ValueError(f"Sumbu tabel {path} harus berjarak seragam")
+
+            data = np.full((len(df), len(KOLOM)), np.nan)
+            for i, nama in enumerate(KOLOM):
+                if nama in df.columns:
+                    data[:, i] = df[nama].to_numpy(dtype=float)
+            tabel[kunci] = (float(sumbu[0]), float(langkah[0]), data)
+        return cls(tabel)
+
+    def nilai(self, indikator, gender, x, kolom=('L', 'M', 'S')):
+        # Interpolasi linear antar baris tabel; x di luar tabel menghasilkan NaN.
+        x = np.asarray(x, dtype=float)
+        idx_kolom = [INDEKS_KOLOM[k] for k in kolom]
+        hasil = np.full(x.shape + (len(kolom),), np.nan)
+
+        gender = np.asarray(gender)
+        if gender.ndim == 0:
+            kelompok = [(kunci_gender(gender.item()), np.ones(x.shape, dtype=bool))]
+        else:
+            laki = mask_laki(gender)
+            kelompok = [('laki-laki', laki), ('perempuan', ~laki)]
+
+        for g, mask in kelompok:
+            if not mask.any():
+                continue
+            awal, langkah, data = self.tabel[(indikator, g)]
+            posisi = (x[mask] - awal) / langkah
+            dalam = (posisi >= 0) & (posisi <= len(data) - 1)
+            i = np.clip(np.floor(np.nan_to_num(posisi)).astype(int), 0, len(data) - 2)
+            t = (np.nan_to_num(posisi) - i)[:, None]
+            baris = data[i][:, idx_kolom] * (1 - t) + data[i + 1][:, idx_kolom] * t
+            baris[~dalam] = np.nan
+            hasil[mask] = baris
+        return hasil
+
+    def z_score(self, indikator, gender, x, ukuran):
+        lms = self.nilai(indikator, gender, x)
+        L, M, S = lms[..., 0], lms[..., 1], lms[..., 2]
+        ukuran = np.asarray(ukuran, dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(L == 0, np.log(ukuran / M) / S, ((ukuran / M) ** L - 1) / (S * L))